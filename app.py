@@ -24,13 +24,14 @@ from config import (
 )
 from utils import (
     retrieve_relevant_chunks,
-    generate_response,
+    stream_response,
     calculate_mortgage_payment,
     get_base64_encoded_image,
     get_base64_pdf,
     extract_text_from_pdf,
-    split_text_into_chunks,
+    documents_from_text,
     initialize_db,
+    ingest,
     assess_risk_level,
     calculate_insurance_premium
 )
@@ -52,6 +53,8 @@ from backend.mortgage_journey import (
     MortgageType,
     ProtectionDiscussionStatus,
     LifeEvent,
+    STAGE_ORDER,
+    STAGE_INDEX,
     get_journey_stage_description
 )
 from backend.conversation_guides import (
@@ -92,6 +95,8 @@ if "recommendations" not in st.session_state:
     st.session_state.recommendations = []
 if "session_id" not in st.session_state:
     st.session_state.session_id = str(uuid.uuid4())
+if "processed_upload" not in st.session_state:
+    st.session_state.processed_upload = None
 
 # Initialize mortgage journey state variables
 if "mortgage_journey" not in st.session_state:
@@ -279,6 +284,11 @@ def display_pdf(pdf_path):
     except Exception as e:
         st.error(f"Error displaying PDF: {e}")
 
+@st.cache_resource(show_spinner="Loading knowledge base...")
+def load_knowledge_base():
+    """Ingest the docs folder once per server process rather than on every rerun"""
+    return ingest(DOCS_DIR)
+
 def upload_and_process_document():
     """Upload and process a document for the knowledge base"""
     st.subheader("Upload Document to Knowledge Base")
@@ -286,6 +296,12 @@ def upload_and_process_document():
     uploaded_file = st.file_uploader("Upload PDF document", type=["pdf"])
     
     if uploaded_file is not None:
+        # The uploader keeps its file across reruns, only process it the first time
+        upload_key = (uploaded_file.name, uploaded_file.size)
+        if st.session_state.processed_upload == upload_key:
+            st.success(f"{uploaded_file.name} is already in the knowledge base.")
+            return
+        
         # Create docs directory if it doesn't exist
         os.makedirs(DOCS_DIR, exist_ok=True)
         
@@ -296,25 +312,22 @@ def upload_and_process_document():
         
         st.info(f"Processing {uploaded_file.name}...")
         
-        # Extract text from PDF
-        text = extract_text_from_pdf(file_path)
-        
-        # Split text into chunks
-        chunks = split_text_into_chunks(text)
+        # Extract text from PDF, and don't leave an unreadable file behind for the next ingest
+        try:
+            text = extract_text_from_pdf(file_path, workers=os.cpu_count() or 1)
+        except Exception as e:
+            os.remove(file_path)
+            st.error(f"Could not read {uploaded_file.name}: {e}")
+            return
         
-        # Prepare documents for vector database
-        documents = []
-        for i, chunk in enumerate(chunks):
-            documents.append({
-                "id": f"{uploaded_file.name}-chunk-{i}",
-                "content": chunk,
-                "source": uploaded_file.name
-            })
+        # Split text into chunks and prepare them for the vector database
+        documents = documents_from_text(text, uploaded_file.name)
         
         # Initialize database with documents
         success = initialize_db(documents)
         
         if success:
+            st.session_state.processed_upload = upload_key
             st.success(f"Successfully processed {uploaded_file.name} and added to the knowledge base.")
         else:
             st.error("There was an error processing the document.")
@@ -352,8 +365,8 @@ def chatbot_interface():
             # Get relevant documents
             relevant_docs = retrieve_relevant_chunks(user_input)
             
-            # Generate response
-            response = generate_response(user_input, relevant_docs, user_info=user_info)
+            # Stream the response as it is generated
+            response = st.write_stream(stream_response(user_input, relevant_docs, user_info=user_info)).strip()
             
             # Add assistant response to chat history
             st.session_state.chat_history.append({"role": "assistant", "content": response, "timestamp": str(datetime.now())})
@@ -942,9 +955,9 @@ def mortgage_journey_tracker():
             # Current stage selection
             current_stage = st.selectbox(
                 "Current Journey Stage",
-                options=list(MortgageJourneyStage),
+                options=STAGE_ORDER,
                 format_func=lambda x: get_journey_stage_description(x).get("name", x.value),
-                index=list(MortgageJourneyStage).index(journey.current_stage)
+                index=STAGE_INDEX[journey.current_stage]
             )
         
         with col2:
@@ -1365,6 +1378,14 @@ def main():
     # Apply Certus styling
     apply_certus_styling()
     
+    # Make sure the documents in the docs folder are searchable
+    if not load_knowledge_base():
+        # The failure stays cached so reruns don't re-parse the folder, retry only when asked
+        st.sidebar.warning("The knowledge base could not be loaded.")
+        if st.sidebar.button("Reload knowledge base"):
+            load_knowledge_base.clear()
+            st.rerun()
+    
     # Sidebar navigation
     st.sidebar.title("Certus Navigation")
     page = st.sidebar.radio(
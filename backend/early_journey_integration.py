@@ -2,8 +2,11 @@
 Early Mortgage Journey Integration Module for RBC Mortgage & Creditor Insurance Advisor Assistant
 Provides tools to integrate protection discussions earlier in the mortgage journey
 """
+import itertools
+from enum import Enum
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
+import pandas as pd
 from pydantic import BaseModel, Field
 
 from backend.mortgage_journey import (
@@ -11,18 +14,68 @@ from backend.mortgage_journey import (
     MortgageType,
     ProtectionDiscussionStatus,
     LifeEvent,
+    STAGE_ORDER,
+    STAGE_INDEX,
     get_journey_stage_description
 )
 
+class OpportunityType(str, Enum):
+    """Kinds of protection discussion opportunities"""
+    IDEAL_TIMING = "ideal_timing"
+    LIFE_EVENT = "life_event"
+    RISK_FACTOR = "risk_factor"
+    LAST_OPPORTUNITY = "last_opportunity"
+    FOLLOW_UP = "follow_up"
+
+class Priority(str, Enum):
+    """Priority of a protection discussion"""
+    HIGH = "high"
+    MEDIUM = "medium"
+    LOW = "low"
+
+# Stage at which each mortgage type is best suited to a protection discussion
+_IDEAL_STAGES = {
+    MortgageType.NEW_PURCHASE: MortgageJourneyStage.DOCUMENTATION_COLLECTION,
+    MortgageType.REFINANCE: MortgageJourneyStage.DOCUMENTATION_COLLECTION,
+    MortgageType.RENEWAL: MortgageJourneyStage.INITIAL_INQUIRY,
+    MortgageType.TRANSFER: MortgageJourneyStage.DOCUMENTATION_COLLECTION,
+    MortgageType.INVESTMENT_PROPERTY: MortgageJourneyStage.APPLICATION_SUBMISSION
+}
+
+# Last stages at which protection can easily be added before funding
+_LAST_CHANCE_STAGES = (MortgageJourneyStage.APPROVAL, MortgageJourneyStage.CLOSING)
+
+_HIGH_MORTGAGE_TO_INCOME_TALKING_POINTS = [
+    "Your mortgage payments represent a significant portion of your income, which could make it challenging to maintain if your income was interrupted.",
+    "Disability and job loss protection can help ensure you can keep making payments even if you're unable to work temporarily."
+]
+
+_JOB_STABILITY_TALKING_POINTS = [
+    "With less than two years at your current job, you might not qualify for full benefits or severance if something unexpected happened.",
+    "Job loss protection can provide a safety net while you're establishing yourself in your role."
+]
+
+_LAST_OPPORTUNITY_TALKING_POINTS = [
+    "This is the last opportunity to easily add protection coverage before your mortgage is funded.",
+    "After funding, adding protection would require a separate application process."
+]
+
+def _dependents_talking_points(dependents: Any) -> List[str]:
+    """Talking points for a client whose dependents rely on their income"""
+    return [
+        f"With {dependents} dependents, protecting your mortgage is an important part of ensuring their financial security.",
+        "HomeProtector insurance ensures your family can stay in their home even if something happens to you."
+    ]
+
 class ProtectionOpportunity(BaseModel):
     """Model for a protection discussion opportunity"""
     opportunity_id: str
     client_id: str
     journey_stage: MortgageJourneyStage
-    opportunity_type: str  # "ideal_timing", "life_event", "risk_factor", etc.
+    opportunity_type: OpportunityType
     description: str
     talking_points: List[str]
-    priority: str  # "high", "medium", "low"
+    priority: Priority
     created_at: datetime = Field(default_factory=datetime.now)
     expires_at: Optional[datetime] = None
     
@@ -62,9 +115,9 @@ class ProtectionDiscussionTracker(BaseModel):
         # Determine next best stage for discussion based on current status
         if status in [ProtectionDiscussionStatus.NOT_DISCUSSED, ProtectionDiscussionStatus.BRIEFLY_MENTIONED]:
             # If not discussed or only briefly mentioned, suggest next stage for detailed discussion
-            current_stage_index = list(MortgageJourneyStage).index(stage)
-            if current_stage_index < len(list(MortgageJourneyStage)) - 1:
-                self.next_discussion_stage = list(MortgageJourneyStage)[current_stage_index + 1]
+            current_stage_index = STAGE_INDEX[stage]
+            if current_stage_index < len(STAGE_ORDER) - 1:
+                self.next_discussion_stage = STAGE_ORDER[current_stage_index + 1]
             else:
                 self.next_discussion_stage = stage
         elif status == ProtectionDiscussionStatus.DETAILED_DISCUSSION:
@@ -86,29 +139,23 @@ def identify_protection_opportunities(
     mortgage journey stage, and any recent life events
     """
     opportunities = []
+    now = datetime.now()
     
     # Get stage information
     stage_info = get_journey_stage_description(journey_stage)
     
     # Check if current stage is ideal for protection discussion
-    ideal_stages = {
-        MortgageType.NEW_PURCHASE: MortgageJourneyStage.DOCUMENTATION_COLLECTION,
-        MortgageType.REFINANCE: MortgageJourneyStage.DOCUMENTATION_COLLECTION,
-        MortgageType.RENEWAL: MortgageJourneyStage.INITIAL_INQUIRY,
-        MortgageType.TRANSFER: MortgageJourneyStage.DOCUMENTATION_COLLECTION,
-        MortgageType.INVESTMENT_PROPERTY: MortgageJourneyStage.APPLICATION_SUBMISSION
-    }
-    
-    if journey_stage == ideal_stages.get(mortgage_type, MortgageJourneyStage.DOCUMENTATION_COLLECTION):
+    if journey_stage == _IDEAL_STAGES.get(mortgage_type, MortgageJourneyStage.DOCUMENTATION_COLLECTION):
         opportunities.append(
             ProtectionOpportunity(
                 opportunity_id=f"ideal_timing_{client_data.get('client_id', 'unknown')}",
                 client_id=client_data.get("client_id", "unknown"),
                 journey_stage=journey_stage,
-                opportunity_type="ideal_timing",
+                opportunity_type=OpportunityType.IDEAL_TIMING,
                 description=f"Ideal stage to discuss protection for {mortgage_type.value} mortgage",
                 talking_points=stage_info.get("protection_talking_points", []),
-                priority="high"
+                priority=Priority.HIGH,
+                created_at=now
             )
         )
     
@@ -123,10 +170,11 @@ def identify_protection_opportunities(
                     opportunity_id=f"life_event_{event.value}_{client_data.get('client_id', 'unknown')}",
                     client_id=client_data.get("client_id", "unknown"),
                     journey_stage=journey_stage,
-                    opportunity_type="life_event",
+                    opportunity_type=OpportunityType.LIFE_EVENT,
                     description=f"Protection opportunity based on life event: {event.value}",
                     talking_points=talking_points,
-                    priority="high"
+                    priority=Priority.HIGH,
+                    created_at=now
                 )
             )
     
@@ -140,13 +188,11 @@ def identify_protection_opportunities(
                 opportunity_id=f"risk_dependents_{client_data.get('client_id', 'unknown')}",
                 client_id=client_data.get("client_id", "unknown"),
                 journey_stage=journey_stage,
-                opportunity_type="risk_factor",
+                opportunity_type=OpportunityType.RISK_FACTOR,
                 description="Client has dependents who rely on their income",
-                talking_points=[
-                    f"With {client_data.get('dependents')} dependents, protecting your mortgage is an important part of ensuring their financial security.",
-                    "HomeProtector insurance ensures your family can stay in their home even if something happens to you."
-                ],
-                priority="high"
+                talking_points=_dependents_talking_points(client_data.get("dependents")),
+                priority=Priority.HIGH,
+                created_at=now
             )
         )
     
@@ -157,13 +203,11 @@ def identify_protection_opportunities(
                 opportunity_id=f"risk_mortgage_income_{client_data.get('client_id', 'unknown')}",
                 client_id=client_data.get("client_id", "unknown"),
                 journey_stage=journey_stage,
-                opportunity_type="risk_factor",
+                opportunity_type=OpportunityType.RISK_FACTOR,
                 description="Client has high mortgage-to-income ratio",
-                talking_points=[
-                    "Your mortgage payments represent a significant portion of your income, which could make it challenging to maintain if your income was interrupted.",
-                    "Disability and job loss protection can help ensure you can keep making payments even if you're unable to work temporarily."
-                ],
-                priority="medium"
+                talking_points=_HIGH_MORTGAGE_TO_INCOME_TALKING_POINTS,
+                priority=Priority.MEDIUM,
+                created_at=now
             )
         )
     
@@ -174,30 +218,26 @@ def identify_protection_opportunities(
                 opportunity_id=f"risk_job_stability_{client_data.get('client_id', 'unknown')}",
                 client_id=client_data.get("client_id", "unknown"),
                 journey_stage=journey_stage,
-                opportunity_type="risk_factor",
+                opportunity_type=OpportunityType.RISK_FACTOR,
                 description="Client has limited job tenure",
-                talking_points=[
-                    "With less than two years at your current job, you might not qualify for full benefits or severance if something unexpected happened.",
-                    "Job loss protection can provide a safety net while you're establishing yourself in your role."
-                ],
-                priority="medium"
+                talking_points=_JOB_STABILITY_TALKING_POINTS,
+                priority=Priority.MEDIUM,
+                created_at=now
             )
         )
     
     # Check if this is last opportunity before funding
-    if journey_stage in [MortgageJourneyStage.APPROVAL, MortgageJourneyStage.CLOSING]:
+    if journey_stage in _LAST_CHANCE_STAGES:
         opportunities.append(
             ProtectionOpportunity(
                 opportunity_id=f"last_opportunity_{client_data.get('client_id', 'unknown')}",
                 client_id=client_data.get("client_id", "unknown"),
                 journey_stage=journey_stage,
-                opportunity_type="last_opportunity",
+                opportunity_type=OpportunityType.LAST_OPPORTUNITY,
                 description="Last opportunity to easily add protection before funding",
-                talking_points=[
-                    "This is the last opportunity to easily add protection coverage before your mortgage is funded.",
-                    "After funding, adding protection would require a separate application process."
-                ],
-                priority="high"
+                talking_points=_LAST_OPPORTUNITY_TALKING_POINTS,
+                priority=Priority.HIGH,
+                created_at=now
             )
         )
     
@@ -208,19 +248,103 @@ def identify_protection_opportunities(
                 opportunity_id=f"follow_up_{client_data.get('client_id', 'unknown')}",
                 client_id=client_data.get("client_id", "unknown"),
                 journey_stage=journey_stage,
-                opportunity_type="follow_up",
+                opportunity_type=OpportunityType.FOLLOW_UP,
                 description="Follow up on previous protection discussion",
                 talking_points=[
                     "I wanted to follow up on our previous conversation about mortgage protection.",
                     "Have you had a chance to think about the protection options we discussed?",
                     "Do you have any questions I can answer about how the coverage works?"
                 ],
-                priority="medium"
+                priority=Priority.MEDIUM,
+                created_at=now
             )
         )
     
     return opportunities
 
+def identify_protection_opportunities_batch(clients_df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    Identify protection opportunities for many clients at once.
+
+    clients_df needs the columns client_id, dependents, mortgage_amount, annual_income,
+    years_at_current_job, journey_stage and mortgage_type (enum members or their values).
+    The profile and stage checks are evaluated as vectorized masks and records are only
+    built for matching rows. Life event and follow-up opportunities depend on per-client
+    history and are left to identify_protection_opportunities.
+
+    Returns opportunity records with the same fields as ProtectionOpportunity, grouped
+    by opportunity type.
+    """
+    now = datetime.now()
+    ideal_stage = clients_df["mortgage_type"].map(_IDEAL_STAGES).fillna(MortgageJourneyStage.DOCUMENTATION_COLLECTION)
+    
+    mask_ideal = clients_df["journey_stage"] == ideal_stage
+    mask_dep = clients_df["dependents"] > 0
+    mask_mti = clients_df["mortgage_amount"] > clients_df["annual_income"] * 3
+    mask_job = clients_df["years_at_current_job"] < 2
+    mask_last = clients_df["journey_stage"].isin(_LAST_CHANCE_STAGES)
+    
+    def record(row, opportunity_id, opportunity_type, description, talking_points, priority):
+        return {
+            "opportunity_id": f"{opportunity_id}_{row.client_id}",
+            "client_id": row.client_id,
+            "journey_stage": MortgageJourneyStage(row.journey_stage),
+            "opportunity_type": opportunity_type,
+            "description": description,
+            "talking_points": talking_points,
+            "priority": priority,
+            "created_at": now,
+            "expires_at": None
+        }
+    
+    records = [
+        record(
+            row, "ideal_timing", OpportunityType.IDEAL_TIMING,
+            f"Ideal stage to discuss protection for {MortgageType(row.mortgage_type).value} mortgage",
+            get_journey_stage_description(MortgageJourneyStage(row.journey_stage)).get("protection_talking_points", []),
+            Priority.HIGH
+        )
+        for row in clients_df.loc[mask_ideal].itertuples(index=False)
+    ]
+    records += [
+        record(
+            row, "risk_dependents", OpportunityType.RISK_FACTOR,
+            "Client has dependents who rely on their income",
+            _dependents_talking_points(row.dependents),
+            Priority.HIGH
+        )
+        for row in clients_df.loc[mask_dep].itertuples(index=False)
+    ]
+    records += [
+        record(
+            row, "risk_mortgage_income", OpportunityType.RISK_FACTOR,
+            "Client has high mortgage-to-income ratio",
+            list(_HIGH_MORTGAGE_TO_INCOME_TALKING_POINTS),
+            Priority.MEDIUM
+        )
+        for row in clients_df.loc[mask_mti].itertuples(index=False)
+    ]
+    records += [
+        record(
+            row, "risk_job_stability", OpportunityType.RISK_FACTOR,
+            "Client has limited job tenure",
+            list(_JOB_STABILITY_TALKING_POINTS),
+            Priority.MEDIUM
+        )
+        for row in clients_df.loc[mask_job].itertuples(index=False)
+    ]
+    records += [
+        record(
+            row, "last_opportunity", OpportunityType.LAST_OPPORTUNITY,
+            "Last opportunity to easily add protection before funding",
+            list(_LAST_OPPORTUNITY_TALKING_POINTS),
+            Priority.HIGH
+        )
+        for row in clients_df.loc[mask_last].itertuples(index=False)
+    ]
+    
+    return records
+
 def generate_protection_discussion_guide(
     client_data: Dict[str, Any],
     journey_stage: MortgageJourneyStage,
@@ -244,34 +368,28 @@ def generate_protection_discussion_guide(
     is_optimal_time = journey_stage == MortgageJourneyStage.DOCUMENTATION_COLLECTION
     
     # Determine priority level for discussion
-    priority = "low"
+    priority = Priority.LOW
     if is_optimal_time:
-        priority = "high"
+        priority = Priority.HIGH
     elif journey_stage in [MortgageJourneyStage.APPROVAL, MortgageJourneyStage.CLOSING]:
-        priority = "high"  # Last chance before funding
-    elif any(opp.priority == "high" for opp in opportunities):
-        priority = "high"
-    elif any(opp.priority == "medium" for opp in opportunities):
-        priority = "medium"
-    
-    # Compile talking points from all opportunities
-    all_talking_points = []
-    for opp in opportunities:
-        all_talking_points.extend(opp.talking_points)
+        priority = Priority.HIGH  # Last chance before funding
+    elif any(opp.priority == Priority.HIGH for opp in opportunities):
+        priority = Priority.HIGH
+    elif any(opp.priority == Priority.MEDIUM for opp in opportunities):
+        priority = Priority.MEDIUM
     
-    # Remove duplicates while preserving order
-    unique_talking_points = []
-    for point in all_talking_points:
-        if point not in unique_talking_points:
-            unique_talking_points.append(point)
+    # Compile talking points from all opportunities, removing duplicates while preserving order
+    unique_talking_points = list(dict.fromkeys(
+        itertools.chain.from_iterable(opp.talking_points for opp in opportunities)
+    ))
     
     # Generate introduction based on stage and opportunities
     introduction = f"This is a good time to discuss mortgage protection because you're at the {stage_info.get('name', journey_stage.value)} stage of your mortgage journey."
     
-    if any(opp.opportunity_type == "life_event" for opp in opportunities):
+    if any(opp.opportunity_type == OpportunityType.LIFE_EVENT for opp in opportunities):
         introduction += " Recent changes in your life situation make protection particularly relevant now."
     
-    if any(opp.opportunity_type == "last_opportunity" for opp in opportunities):
+    if any(opp.opportunity_type == OpportunityType.LAST_OPPORTUNITY for opp in opportunities):
         introduction += " This is one of the last opportunities to easily add protection before your mortgage is funded."
     
     # Generate objection handling guidance
@@ -302,7 +420,7 @@ def generate_protection_discussion_guide(
         "client_concerns": stage_info.get("client_concerns", []),
         "talking_points": unique_talking_points,
         "objection_handling": prioritized_objection_tips,
-        "opportunities": [opp.dict() for opp in opportunities],
+        "opportunities": [opp.model_dump() for opp in opportunities],
         "recommended_next_steps": []
     }
     
@@ -2,7 +2,11 @@
 Journey Visualization Module for RBC Mortgage & Creditor Insurance Advisor Assistant
 Provides tools for visualizing the mortgage journey and protection discussion opportunities
 """
+import importlib.util
 import plotly.graph_objects as go
+import plotly.io as pio
+import numpy as np
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 import pandas as pd
 from datetime import datetime, timedelta
@@ -11,16 +15,32 @@ from backend.mortgage_journey import (
     MortgageJourney,
     MortgageJourneyStage,
     ProtectionDiscussionStatus,
+    STAGE_ORDER,
+    STAGE_INDEX,
+    STAGE_AVERAGE_DAYS,
     get_journey_stage_description
 )
 
+# Serialize figures with orjson when it is available, it is much faster than the default JSON encoder
+if importlib.util.find_spec("orjson") is not None:
+    pio.json.config.default_engine = "orjson"
+
+# Marker styles shared by every timeline (Plotly copies these, they are never mutated)
+_STAGE_BAR_LINE = dict(width=1, color='rgba(0,0,0,0.3)')  # Border on bars for better visibility
+_OPTIMAL_STAGE_MARKER = dict(
+    symbol='star',
+    size=18,  # Slightly larger for better visibility
+    color='#FEDF01',  # RBC Yellow
+    line=dict(color='#0042B2', width=2)  # RBC Blue border
+)
+
 def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
     """
     Create an interactive timeline visualization of a client's mortgage journey
     with protection discussion opportunities highlighted
     """
     # Get all stages in order
-    all_stages = list(MortgageJourneyStage)
+    all_stages = STAGE_ORDER
     
     # Prepare data for timeline
     stages = []
@@ -29,7 +49,19 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
     colors = []
     hover_texts = []
     
-    current_stage_index = all_stages.index(journey.current_stage)
+    current_stage_index = STAGE_INDEX[journey.current_stage]
+    now = datetime.now()
+    
+    # Protection discussion details don't change from stage to stage
+    discussion_date = journey.protection_discussion_date
+    discussion_recorded = (
+        journey.protection_discussion != ProtectionDiscussionStatus.NOT_DISCUSSED and
+        bool(discussion_date)
+    )
+    discussion_text = (
+        f"<br><b>Protection discussed:</b> {journey.protection_discussion.value.replace('_', ' ').title()}"
+        if discussion_recorded else ""
+    )
     
     # Add past and current stages
     for i, stage in enumerate(all_stages[:current_stage_index + 1]):
@@ -53,29 +85,26 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
                 end_date = start_date + timedelta(days=3)  # Simple estimation
         else:
             # Current stage
-            end_date = datetime.now()
+            end_date = now
+        
+        discussed_in_stage = discussion_recorded and start_date <= discussion_date <= end_date
         
         # Determine color based on protection discussion status
         if stage == journey.current_stage:
             color = "rgba(254, 223, 1, 0.8)"  # RBC Yellow for current stage
-        elif journey.protection_discussion != ProtectionDiscussionStatus.NOT_DISCUSSED and \
-             journey.protection_discussion_date and \
-             start_date <= journey.protection_discussion_date <= end_date:
+        elif discussed_in_stage:
             color = "rgba(0, 66, 178, 0.8)"  # RBC Blue for stages with protection discussion
         else:
             color = "rgba(150, 150, 150, 0.6)"  # Grey for other completed stages
         
         # Create hover text with stage info and protection status
-        protection_text = ""
-        if journey.protection_discussion != ProtectionDiscussionStatus.NOT_DISCUSSED and \
-           journey.protection_discussion_date and \
-           start_date <= journey.protection_discussion_date <= end_date:
-            protection_text = f"<br><b>Protection discussed:</b> {journey.protection_discussion.value.replace('_', ' ').title()}"
+        protection_text = discussion_text if discussed_in_stage else ""
         
-        hover_text = f"<b>{stage_name}</b><br>" + \
-                     f"Start: {start_date.strftime('%Y-%m-%d')}<br>" + \
-                     f"End: {end_date.strftime('%Y-%m-%d')}" + \
-                     protection_text
+        hover_text = (
+            f"<b>{stage_name}</b><br>"
+            f"Start: {start_date:%Y-%m-%d}<br>"
+            f"End: {end_date:%Y-%m-%d}{protection_text}"
+        )
         
         stages.append(stage_name)
         start_dates.append(start_date)
@@ -90,12 +119,7 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
         
         # Estimate dates
         typical_duration = stage_info.get("typical_duration", "3-7 days")
-        # Extract average days from typical duration format like "3-7 days"
-        try:
-            days_range = typical_duration.split(" ")[0].split("-")
-            avg_days = (int(days_range[0]) + int(days_range[1])) / 2
-        except:
-            avg_days = 5  # Default if parsing fails
+        avg_days = STAGE_AVERAGE_DAYS.get(stage, 5)  # Default if there is no typical range
         
         start_date = end_dates[-1]
         end_date = start_date + timedelta(days=avg_days)
@@ -105,16 +129,14 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
         end_dates.append(end_date)
         colors.append("rgba(220, 220, 220, 0.3)")  # Light grey for future stages
         
-        hover_text = f"<b>{stage_name}</b> (Upcoming)<br>" + \
-                     f"Estimated start: {start_date.strftime('%Y-%m-%d')}<br>" + \
-                     f"Estimated duration: {typical_duration}"
+        hover_text = (
+            f"<b>{stage_name}</b> (Upcoming)<br>"
+            f"Estimated start: {start_date:%Y-%m-%d}<br>"
+            f"Estimated duration: {typical_duration}"
+        )
         hover_texts.append(hover_text)
     
     # Create a simpler timeline visualization that avoids datetime serialization issues
-    # Convert datetime objects to strings for JSON serialization
-    start_dates_str = [date.strftime('%Y-%m-%d') for date in start_dates]
-    end_dates_str = [date.strftime('%Y-%m-%d') for date in end_dates]
-    
     # Calculate durations in days for bar lengths
     durations = [(end - start).days for start, end in zip(start_dates, end_dates)]
     # Ensure minimum duration of 1 day for visibility
@@ -126,21 +148,17 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
     # Create better display names for stages (capitalize and replace underscores)
     stages_display = [stage.replace('_', ' ').title() if '_' in stage else stage for stage in stages]
     
-    # Add horizontal bars for each stage with improved styling
-    for i in range(len(stages)):
-        fig.add_trace(go.Bar(
-            y=[stages_display[i]],  # Use the more readable display names
-            x=[durations[i]],
-            orientation='h',
-            marker=dict(
-                color=colors[i],
-                line=dict(width=1, color='rgba(0,0,0,0.3)')  # Add border to bars for better visibility
-            ),
-            hoverinfo='text',
-            hovertext=hover_texts[i],
-            name=stages_display[i],
-            showlegend=False
-        ))
+    # Add horizontal bars for all stages as a single trace with per-bar colors and hover text
+    fig.add_trace(go.Bar(
+        y=stages_display,  # Use the more readable display names
+        x=durations,
+        orientation='h',
+        marker=dict(color=colors, line=_STAGE_BAR_LINE),
+        hoverinfo='text',
+        hovertext=hover_texts,
+        name="Journey Stages",
+        showlegend=False
+    ))
     
     # Add protection opportunity markers
     optimal_stage = journey.get_optimal_protection_discussion_stage()
@@ -159,12 +177,7 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
             x=[marker_position],
             y=[stages_display[optimal_index]],  # Use the display name here
             mode='markers',
-            marker=dict(
-                symbol='star',
-                size=18,  # Slightly larger for better visibility
-                color='#FEDF01',  # RBC Yellow
-                line=dict(color='#0042B2', width=2)  # RBC Blue border
-            ),
+            marker=_OPTIMAL_STAGE_MARKER,
             name='Optimal Protection Discussion',
             hoverinfo='text',
             hovertext=f"<b>Optimal time to discuss protection</b><br>Stage: {optimal_stage_display}"
@@ -172,15 +185,13 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
     
     # Add current date annotation instead of a marker
     # This avoids datetime serialization issues
-    now = datetime.now()
-    
     # Add annotation for current date with improved styling
     fig.add_annotation(
         x=0,
         y=1.08,
         xref="paper",
         yref="paper",
-        text=f"<b>Current Date:</b> {now.strftime('%Y-%m-%d')}",
+        text=f"<b>Current Date:</b> {now:%Y-%m-%d}",
         showarrow=False,
         font=dict(color="#0042B2", size=12),
         bgcolor="#FFFFFF",
@@ -247,24 +258,27 @@ def create_journey_timeline(journey: MortgageJourney) -> go.Figure:
     
     return fig
 
-def create_protection_opportunity_gauge(
-    journey: MortgageJourney,
-    client_data: Dict[str, Any]
-) -> go.Figure:
+@lru_cache(maxsize=1024)
+def _opportunity_score(
+    current_stage: MortgageJourneyStage,
+    optimal_stage: MortgageJourneyStage,
+    protection_discussion: ProtectionDiscussionStatus,
+    dependents: int,
+    mortgage_amount: float,
+    annual_income: float
+) -> int:
     """
-    Create a gauge visualization showing the current protection opportunity level
-    based on journey stage, client profile, and other factors
+    Score (0-100) the opportunity to discuss protection, memoized since the
+    gauge is redrawn with the same inputs on every rerun
     """
-    # Calculate opportunity score (0-100)
     score = 50  # Default middle value
     
     # Adjust based on journey stage
-    optimal_stage = journey.get_optimal_protection_discussion_stage()
-    current_stage_idx = list(MortgageJourneyStage).index(journey.current_stage)
-    optimal_stage_idx = list(MortgageJourneyStage).index(optimal_stage)
+    current_stage_idx = STAGE_INDEX[current_stage]
+    optimal_stage_idx = STAGE_INDEX[optimal_stage]
     
     # Highest score when at optimal stage
-    if journey.current_stage == optimal_stage:
+    if current_stage == optimal_stage:
         score += 30
     # Decreasing score as we move away from optimal stage
     elif current_stage_idx < optimal_stage_idx:
@@ -277,26 +291,44 @@ def create_protection_opportunity_gauge(
         score += max(0, 20 - distance * 5)
     
     # Adjust based on protection discussion status
-    if journey.protection_discussion == ProtectionDiscussionStatus.NOT_DISCUSSED:
+    if protection_discussion == ProtectionDiscussionStatus.NOT_DISCUSSED:
         score += 10  # Opportunity to start discussion
-    elif journey.protection_discussion == ProtectionDiscussionStatus.BRIEFLY_MENTIONED:
+    elif protection_discussion == ProtectionDiscussionStatus.BRIEFLY_MENTIONED:
         score += 15  # Good opportunity to follow up
-    elif journey.protection_discussion == ProtectionDiscussionStatus.DETAILED_DISCUSSION:
+    elif protection_discussion == ProtectionDiscussionStatus.DETAILED_DISCUSSION:
         score += 5  # Some opportunity to follow up
-    elif journey.protection_discussion == ProtectionDiscussionStatus.CLIENT_INTERESTED:
+    elif protection_discussion == ProtectionDiscussionStatus.CLIENT_INTERESTED:
         score += 20  # Strong opportunity to close
-    elif journey.protection_discussion == ProtectionDiscussionStatus.CLIENT_DECLINED:
+    elif protection_discussion == ProtectionDiscussionStatus.CLIENT_DECLINED:
         score -= 30  # Lower opportunity if client declined
     
     # Adjust based on client risk factors
-    if client_data.get("dependents", 0) > 0:
-        score += 5 * min(client_data.get("dependents", 0), 3)  # Up to +15 for dependents
+    if dependents > 0:
+        score += 5 * min(dependents, 3)  # Up to +15 for dependents
     
-    if client_data.get("mortgage_amount", 0) > client_data.get("annual_income", 0) * 3:
+    if mortgage_amount > annual_income * 3:
         score += 10  # Higher score for high mortgage-to-income ratio
     
     # Cap score between 0 and 100
-    score = max(0, min(100, score))
+    return max(0, min(100, score))
+
+def create_protection_opportunity_gauge(
+    journey: MortgageJourney,
+    client_data: Dict[str, Any]
+) -> go.Figure:
+    """
+    Create a gauge visualization showing the current protection opportunity level
+    based on journey stage, client profile, and other factors
+    """
+    # Calculate opportunity score (0-100)
+    score = _opportunity_score(
+        journey.current_stage,
+        journey.get_optimal_protection_discussion_stage(),
+        journey.protection_discussion,
+        client_data.get("dependents", 0),
+        client_data.get("mortgage_amount", 0),
+        client_data.get("annual_income", 0)
+    )
     
     # Determine opportunity level and color
     if score >= 75:
@@ -341,6 +373,21 @@ def create_protection_opportunity_gauge(
     
     return fig
 
+# (duration_months, income_reduction, with_protection_coverage) for each impact scenario
+_SCENARIOS = {
+    "disability": (6, 0.4, 0.8),  # 40% of income lost, 80% of mortgage payment covered
+    "critical_illness": (12, 0.6, 1.0),  # 60% of income lost, 100% of mortgage payment covered (lump sum)
+    "job_loss": (3, 1.0, 0.6),  # 100% of income lost, 60% of mortgage payment covered
+    "death": (24, 1.0, 1.0)  # Longer-term impact, 100% of primary income lost, mortgage paid off
+}
+
+_SCENARIO_TITLES = {
+    "disability": "Financial Impact of Disability",
+    "critical_illness": "Financial Impact of Critical Illness",
+    "job_loss": "Financial Impact of Job Loss",
+    "death": "Financial Impact of Death on Family"
+}
+
 def create_protection_impact_chart(
     client_data: Dict[str, Any],
     scenario_type: str = "disability"
@@ -358,79 +405,30 @@ def create_protection_impact_chart(
     # Calculate basic monthly expenses (estimated)
     monthly_expenses = monthly_income * 0.7  # Assumption: 70% of income goes to expenses
     
-    # Scenario parameters
-    if scenario_type == "disability":
-        duration_months = 6
-        income_reduction = 0.4  # 40% of income lost
-        with_protection_coverage = 0.8  # 80% of mortgage payment covered
-    elif scenario_type == "critical_illness":
-        duration_months = 12
-        income_reduction = 0.6  # 60% of income lost
-        with_protection_coverage = 1.0  # 100% of mortgage payment covered (lump sum)
-    elif scenario_type == "job_loss":
-        duration_months = 3
-        income_reduction = 1.0  # 100% of income lost
-        with_protection_coverage = 0.6  # 60% of mortgage payment covered
-    elif scenario_type == "death":
-        duration_months = 24  # Looking at longer-term impact
-        income_reduction = 1.0  # 100% of primary income lost
-        with_protection_coverage = 1.0  # 100% of mortgage paid off
-    else:
-        # Default to disability scenario
-        duration_months = 6
-        income_reduction = 0.4
-        with_protection_coverage = 0.8
+    # Scenario parameters, defaulting to the disability scenario
+    duration_months, income_reduction, with_protection_coverage = _SCENARIOS.get(
+        scenario_type, _SCENARIOS["disability"]
+    )
     
     # Calculate financial impact
     months = list(range(1, duration_months + 1))
     
     # Without protection
-    income_without_protection = [monthly_income * (1 - income_reduction) for _ in months]
-    expenses_without_protection = [monthly_expenses for _ in months]
-    mortgage_without_protection = [monthly_payment for _ in months]
-    
-    balance_without_protection = [
-        income - expenses - mortgage 
-        for income, expenses, mortgage in zip(
-            income_without_protection, 
-            expenses_without_protection, 
-            mortgage_without_protection
-        )
-    ]
+    income = np.full(duration_months, monthly_income * (1 - income_reduction))
+    expenses = np.full(duration_months, monthly_expenses)
+    mortgage_without_protection = np.full(duration_months, float(monthly_payment))
     
-    cumulative_balance_without = []
-    current_balance = 0
-    for monthly_balance in balance_without_protection:
-        current_balance += monthly_balance
-        cumulative_balance_without.append(current_balance)
+    cumulative_balance_without = np.cumsum(income - expenses - mortgage_without_protection).tolist()
     
     # With protection
-    income_with_protection = income_without_protection.copy()
-    expenses_with_protection = expenses_without_protection.copy()
-    
     if scenario_type == "death":
         # Mortgage is paid off
-        mortgage_with_protection = [0 for _ in months]
+        mortgage_with_protection = np.zeros(duration_months)
     else:
         # Partial coverage of mortgage
-        mortgage_with_protection = [
-            monthly_payment * (1 - with_protection_coverage) for _ in months
-        ]
-    
-    balance_with_protection = [
-        income - expenses - mortgage 
-        for income, expenses, mortgage in zip(
-            income_with_protection, 
-            expenses_with_protection, 
-            mortgage_with_protection
-        )
-    ]
+        mortgage_with_protection = np.full(duration_months, monthly_payment * (1 - with_protection_coverage))
     
-    cumulative_balance_with = []
-    current_balance = 0
-    for monthly_balance in balance_with_protection:
-        current_balance += monthly_balance
-        cumulative_balance_with.append(current_balance)
+    cumulative_balance_with = np.cumsum(income - expenses - mortgage_with_protection).tolist()
     
     # Create the chart
     fig = go.Figure()
@@ -463,15 +461,8 @@ def create_protection_impact_chart(
     )
     
     # Customize layout
-    scenario_titles = {
-        "disability": f"Financial Impact of Disability ({duration_months} months)",
-        "critical_illness": f"Financial Impact of Critical Illness ({duration_months} months)",
-        "job_loss": f"Financial Impact of Job Loss ({duration_months} months)",
-        "death": f"Financial Impact of Death on Family ({duration_months} months)"
-    }
-    
     fig.update_layout(
-        title=scenario_titles.get(scenario_type, f"Financial Impact Scenario ({duration_months} months)"),
+        title=f"{_SCENARIO_TITLES.get(scenario_type, 'Financial Impact Scenario')} ({duration_months} months)",
         xaxis=dict(
             title="Month",
             tickmode='linear',
@@ -2,7 +2,9 @@
 Mortgage Journey Module for RBC Mortgage & Creditor Insurance Advisor Assistant
 Defines the stages of the mortgage journey and provides tools for tracking client progress
 """
+import re
 from enum import Enum
+from types import MappingProxyType
 from typing import List, Dict, Optional, Any
 from datetime import datetime, timedelta
 from pydantic import BaseModel, Field
@@ -18,6 +20,10 @@ class MortgageJourneyStage(str, Enum):
     FUNDING = "funding"
     POST_FUNDING = "post_funding"
 
+# Journey stages in order and their positions
+STAGE_ORDER = tuple(MortgageJourneyStage)
+STAGE_INDEX = {stage: i for i, stage in enumerate(STAGE_ORDER)}
+
 class MortgageType(str, Enum):
     """Types of mortgages"""
     NEW_PURCHASE = "new_purchase"
@@ -89,11 +95,10 @@ class MortgageJourney(BaseModel):
         stage_start = self.stage_history[stage]
         
         # Find the next stage after this one
-        stages_order = list(MortgageJourneyStage)
-        stage_index = stages_order.index(stage)
+        stage_index = STAGE_INDEX[stage]
         
-        if stage_index + 1 < len(stages_order):
-            next_stage = stages_order[stage_index + 1]
+        if stage_index + 1 < len(STAGE_ORDER):
+            next_stage = STAGE_ORDER[stage_index + 1]
             if next_stage in self.stage_history:
                 return self.stage_history[next_stage] - stage_start
         
@@ -123,8 +128,7 @@ class MortgageJourney(BaseModel):
         optimal_stage = self.get_optimal_protection_discussion_stage()
         
         # If we're at or past the optimal stage and haven't had a detailed discussion
-        if (list(MortgageJourneyStage).index(self.current_stage) >= 
-            list(MortgageJourneyStage).index(optimal_stage) and
+        if (STAGE_INDEX[self.current_stage] >= STAGE_INDEX[optimal_stage] and
             self.protection_discussion in [
                 ProtectionDiscussionStatus.NOT_DISCUSSED,
                 ProtectionDiscussionStatus.BRIEFLY_MENTIONED
@@ -137,215 +141,240 @@ class MortgageJourney(BaseModel):
             
         return False
 
-def get_journey_stage_description(stage: MortgageJourneyStage) -> Dict[str, Any]:
-    """
-    Get detailed information about a mortgage journey stage
-    including recommended actions and talking points
-    """
-    stage_info = {
-        MortgageJourneyStage.INITIAL_INQUIRY: {
-            "name": "Initial Inquiry",
-            "description": "Client's first contact expressing interest in a mortgage product",
-            "typical_duration": "1-3 days",
-            "client_concerns": [
-                "Getting the best rate",
-                "Understanding how much they can afford",
-                "Learning about the mortgage process"
-            ],
-            "advisor_actions": [
-                "Collect basic client information",
-                "Discuss rate options",
-                "Explain the mortgage process",
-                "Briefly introduce the concept of mortgage protection"
-            ],
-            "protection_talking_points": [
-                "As we begin your mortgage journey, I'd like to mention that RBC offers protection options that can safeguard your mortgage in case of unexpected events.",
-                "We'll discuss this in more detail as we move forward, but it's something to keep in mind as you consider your overall financial picture."
-            ]
-        },
-        MortgageJourneyStage.RATE_SHOPPING: {
-            "name": "Rate Shopping",
-            "description": "Client is comparing rates from different lenders",
-            "typical_duration": "3-7 days",
-            "client_concerns": [
-                "Finding the lowest interest rate",
-                "Understanding different mortgage products",
-                "Comparing offers from different lenders"
-            ],
-            "advisor_actions": [
-                "Present competitive rate options",
-                "Explain the benefits of different mortgage terms",
-                "Highlight RBC's overall value proposition",
-                "Begin to assess client's risk profile"
-            ],
-            "protection_talking_points": [
-                "While rate is important, it's also worth considering the overall protection of your investment.",
-                "RBC's mortgage protection can be a valuable complement to your mortgage, providing peace of mind at a reasonable cost."
-            ]
-        },
-        MortgageJourneyStage.DOCUMENTATION_COLLECTION: {
-            "name": "Documentation Collection",
-            "description": "Gathering necessary financial documents for the application",
-            "typical_duration": "7-14 days",
-            "client_concerns": [
-                "Understanding what documents are needed",
-                "Ensuring their financial situation looks favorable",
-                "Moving the process forward efficiently"
-            ],
-            "advisor_actions": [
-                "Request and organize client documents",
-                "Assess client's financial situation",
-                "Identify potential risks or gaps in protection",
-                "Have a detailed discussion about creditor insurance options"
-            ],
-            "protection_talking_points": [
-                "As I review your financial documents, I notice some potential areas where protection could be valuable for you.",
-                "Let's take a few minutes to discuss how mortgage protection works and how it might fit into your overall financial plan.",
-                "Based on your situation with [specific details like dependents, single income, etc.], here's how our protection options could help..."
-            ]
-        },
-        MortgageJourneyStage.APPLICATION_SUBMISSION: {
-            "name": "Application Submission",
-            "description": "Formal mortgage application is submitted for approval",
-            "typical_duration": "1-3 days",
-            "client_concerns": [
-                "Getting approved for the desired amount",
-                "Understanding next steps",
-                "Timeline for approval"
-            ],
-            "advisor_actions": [
-                "Submit complete application package",
-                "Set expectations for approval timeline",
-                "Follow up on protection discussion if not yet completed"
-            ],
-            "protection_talking_points": [
-                "Now that we've submitted your application, let's make sure we've considered all aspects of your mortgage plan.",
-                "Have you had a chance to think about the protection options we discussed? I'm happy to answer any questions."
-            ]
-        },
-        MortgageJourneyStage.APPROVAL: {
-            "name": "Approval",
-            "description": "Mortgage application has been approved",
-            "typical_duration": "1-3 days",
-            "client_concerns": [
-                "Understanding the terms of approval",
-                "Next steps to finalize the mortgage",
-                "Preparing for closing"
-            ],
-            "advisor_actions": [
-                "Explain approval details",
-                "Discuss next steps",
-                "Finalize protection options if client is interested"
-            ],
-            "protection_talking_points": [
-                "Congratulations on your mortgage approval! Now is a good time to finalize your protection plan.",
-                "Adding protection now is simple and can be processed alongside your mortgage documents."
-            ]
-        },
-        MortgageJourneyStage.CLOSING: {
-            "name": "Closing",
-            "description": "Final paperwork and signing",
-            "typical_duration": "1-7 days",
-            "client_concerns": [
-                "Understanding all documents they're signing",
-                "Ensuring everything is in order",
-                "Finalizing all aspects of the mortgage"
-            ],
-            "advisor_actions": [
-                "Review all documents with client",
-                "Ensure all questions are answered",
-                "Last opportunity to add protection"
-            ],
-            "protection_talking_points": [
-                "As we finalize your mortgage, I want to ensure you've made an informed decision about protection.",
-                "This is the last opportunity to easily add protection coverage before your mortgage is funded."
-            ]
-        },
-        MortgageJourneyStage.FUNDING: {
-            "name": "Funding",
-            "description": "Funds are disbursed",
-            "typical_duration": "1-3 days",
-            "client_concerns": [
-                "Ensuring funds are transferred correctly",
-                "Understanding when they can take possession",
-                "Confirming all conditions have been met"
-            ],
-            "advisor_actions": [
-                "Coordinate with all parties for funding",
-                "Confirm protection choices are processed if selected"
-            ],
-            "protection_talking_points": [
-                "Your mortgage is now being funded. If you've chosen protection, that will be processed simultaneously.",
-                "If you haven't added protection, we can still discuss options after funding, though it will require a separate application."
-            ]
-        },
-        MortgageJourneyStage.POST_FUNDING: {
-            "name": "Post-Funding",
-            "description": "Mortgage is active and client has taken possession",
-            "typical_duration": "Ongoing",
-            "client_concerns": [
-                "Understanding payment procedures",
-                "Knowing who to contact with questions",
-                "Managing their new financial responsibility"
-            ],
-            "advisor_actions": [
-                "Check in with client after move-in",
-                "Ensure they understand payment procedures",
-                "Discuss protection options if not yet added"
-            ],
-            "protection_talking_points": [
-                "Now that you're settled in your new home, it's a good time to revisit protection options if you haven't already.",
-                "Many clients find that the reality of mortgage payments brings new perspective on the value of protection."
-            ]
-        }
-    }
-    
-    return stage_info.get(stage, {})
-
-def get_life_event_protection_talking_points(event: LifeEvent) -> List[str]:
-    """
-    Get talking points about protection that are relevant to specific life events
-    """
-    talking_points = {
-        LifeEvent.NEW_HOME_PURCHASE: [
-            "A new home is one of the biggest investments you'll make. Protection ensures this investment remains secure even if unexpected events occur.",
-            "HomeProtector insurance can help ensure your family keeps their home even if you're unable to make payments due to disability, critical illness, or death."
+# Detailed information about each journey stage, shared by every caller
+_STAGE_INFO = MappingProxyType({
+    MortgageJourneyStage.INITIAL_INQUIRY: {
+        "name": "Initial Inquiry",
+        "description": "Client's first contact expressing interest in a mortgage product",
+        "typical_duration": "1-3 days",
+        "client_concerns": [
+            "Getting the best rate",
+            "Understanding how much they can afford",
+            "Learning about the mortgage process"
+        ],
+        "advisor_actions": [
+            "Collect basic client information",
+            "Discuss rate options",
+            "Explain the mortgage process",
+            "Briefly introduce the concept of mortgage protection"
+        ],
+        "protection_talking_points": [
+            "As we begin your mortgage journey, I'd like to mention that RBC offers protection options that can safeguard your mortgage in case of unexpected events.",
+            "We'll discuss this in more detail as we move forward, but it's something to keep in mind as you consider your overall financial picture."
+        ]
+    },
+    MortgageJourneyStage.RATE_SHOPPING: {
+        "name": "Rate Shopping",
+        "description": "Client is comparing rates from different lenders",
+        "typical_duration": "3-7 days",
+        "client_concerns": [
+            "Finding the lowest interest rate",
+            "Understanding different mortgage products",
+            "Comparing offers from different lenders"
+        ],
+        "advisor_actions": [
+            "Present competitive rate options",
+            "Explain the benefits of different mortgage terms",
+            "Highlight RBC's overall value proposition",
+            "Begin to assess client's risk profile"
+        ],
+        "protection_talking_points": [
+            "While rate is important, it's also worth considering the overall protection of your investment.",
+            "RBC's mortgage protection can be a valuable complement to your mortgage, providing peace of mind at a reasonable cost."
+        ]
+    },
+    MortgageJourneyStage.DOCUMENTATION_COLLECTION: {
+        "name": "Documentation Collection",
+        "description": "Gathering necessary financial documents for the application",
+        "typical_duration": "7-14 days",
+        "client_concerns": [
+            "Understanding what documents are needed",
+            "Ensuring their financial situation looks favorable",
+            "Moving the process forward efficiently"
+        ],
+        "advisor_actions": [
+            "Request and organize client documents",
+            "Assess client's financial situation",
+            "Identify potential risks or gaps in protection",
+            "Have a detailed discussion about creditor insurance options"
+        ],
+        "protection_talking_points": [
+            "As I review your financial documents, I notice some potential areas where protection could be valuable for you.",
+            "Let's take a few minutes to discuss how mortgage protection works and how it might fit into your overall financial plan.",
+            "Based on your situation with [specific details like dependents, single income, etc.], here's how our protection options could help..."
+        ]
+    },
+    MortgageJourneyStage.APPLICATION_SUBMISSION: {
+        "name": "Application Submission",
+        "description": "Formal mortgage application is submitted for approval",
+        "typical_duration": "1-3 days",
+        "client_concerns": [
+            "Getting approved for the desired amount",
+            "Understanding next steps",
+            "Timeline for approval"
+        ],
+        "advisor_actions": [
+            "Submit complete application package",
+            "Set expectations for approval timeline",
+            "Follow up on protection discussion if not yet completed"
         ],
-        LifeEvent.MARRIAGE: [
-            "Congratulations on your marriage! As you combine your lives, it's important to think about how you'll protect each other financially.",
-            "Joint mortgage protection can be more cost-effective than individual policies and ensures either spouse can keep the home if something happens to the other."
+        "protection_talking_points": [
+            "Now that we've submitted your application, let's make sure we've considered all aspects of your mortgage plan.",
+            "Have you had a chance to think about the protection options we discussed? I'm happy to answer any questions."
+        ]
+    },
+    MortgageJourneyStage.APPROVAL: {
+        "name": "Approval",
+        "description": "Mortgage application has been approved",
+        "typical_duration": "1-3 days",
+        "client_concerns": [
+            "Understanding the terms of approval",
+            "Next steps to finalize the mortgage",
+            "Preparing for closing"
+        ],
+        "advisor_actions": [
+            "Explain approval details",
+            "Discuss next steps",
+            "Finalize protection options if client is interested"
         ],
-        LifeEvent.DIVORCE: [
-            "During this transition, it's important to reassess your protection needs, especially if responsibility for the mortgage is changing.",
-            "Individual protection can provide peace of mind as you navigate this new chapter independently."
+        "protection_talking_points": [
+            "Congratulations on your mortgage approval! Now is a good time to finalize your protection plan.",
+            "Adding protection now is simple and can be processed alongside your mortgage documents."
+        ]
+    },
+    MortgageJourneyStage.CLOSING: {
+        "name": "Closing",
+        "description": "Final paperwork and signing",
+        "typical_duration": "1-7 days",
+        "client_concerns": [
+            "Understanding all documents they're signing",
+            "Ensuring everything is in order",
+            "Finalizing all aspects of the mortgage"
         ],
-        LifeEvent.NEW_CHILD: [
-            "Congratulations on your growing family! With a new child, ensuring your family can stay in their home becomes even more important.",
-            "Mortgage protection provides security knowing your child will have a stable home environment regardless of what happens."
+        "advisor_actions": [
+            "Review all documents with client",
+            "Ensure all questions are answered",
+            "Last opportunity to add protection"
         ],
-        LifeEvent.CAREER_CHANGE: [
-            "A career change often means changes in benefits, including any workplace disability or life insurance.",
-            "Mortgage protection can fill gaps in your new benefits package and provide consistent coverage regardless of where you work."
+        "protection_talking_points": [
+            "As we finalize your mortgage, I want to ensure you've made an informed decision about protection.",
+            "This is the last opportunity to easily add protection coverage before your mortgage is funded."
+        ]
+    },
+    MortgageJourneyStage.FUNDING: {
+        "name": "Funding",
+        "description": "Funds are disbursed",
+        "typical_duration": "1-3 days",
+        "client_concerns": [
+            "Ensuring funds are transferred correctly",
+            "Understanding when they can take possession",
+            "Confirming all conditions have been met"
         ],
-        LifeEvent.RETIREMENT_PLANNING: [
-            "As you plan for retirement, it's important to consider how your mortgage fits into your overall plan.",
-            "Protection can be especially valuable during this transition to ensure unexpected health events don't derail your retirement plans."
+        "advisor_actions": [
+            "Coordinate with all parties for funding",
+            "Confirm protection choices are processed if selected"
         ],
-        LifeEvent.HEALTH_CHANGE: [
-            "Changes in health can affect future insurability. Securing protection now ensures you have coverage regardless of future health developments.",
-            "Our critical illness protection can help cover mortgage payments if you're diagnosed with a covered condition."
+        "protection_talking_points": [
+            "Your mortgage is now being funded. If you've chosen protection, that will be processed simultaneously.",
+            "If you haven't added protection, we can still discuss options after funding, though it will require a separate application."
+        ]
+    },
+    MortgageJourneyStage.POST_FUNDING: {
+        "name": "Post-Funding",
+        "description": "Mortgage is active and client has taken possession",
+        "typical_duration": "Ongoing",
+        "client_concerns": [
+            "Understanding payment procedures",
+            "Knowing who to contact with questions",
+            "Managing their new financial responsibility"
         ],
-        LifeEvent.INCOME_CHANGE: [
-            "With changes in your income, it's important to reassess how you would manage your mortgage payments in case of disability or illness.",
-            "Our disability protection can replace a portion of your income specifically for your mortgage payments if you're unable to work."
+        "advisor_actions": [
+            "Check in with client after move-in",
+            "Ensure they understand payment procedures",
+            "Discuss protection options if not yet added"
         ],
-        LifeEvent.DEPENDENT_CARE: [
-            "Taking on responsibility for caring for a dependent adds financial obligations that make protection even more important.",
-            "Mortgage protection ensures your dependent would have a secure place to live even if something happened to you."
+        "protection_talking_points": [
+            "Now that you're settled in your new home, it's a good time to revisit protection options if you haven't already.",
+            "Many clients find that the reality of mortgage payments brings new perspective on the value of protection."
         ]
     }
-    
-    return talking_points.get(event, [
-        "Life changes often bring new financial responsibilities and protection needs.",
-        "Let's discuss how your recent life changes might affect your need for mortgage protection."
-    ])
+})
+
+def get_journey_stage_description(stage: MortgageJourneyStage) -> Dict[str, Any]:
+    """
+    Get detailed information about a mortgage journey stage
+    including recommended actions and talking points.
+    """
+    # Copy the lists as well, so callers can't change the shared stage details
+    return {
+        key: list(value) if isinstance(value, list) else value
+        for key, value in _STAGE_INFO.get(stage, {}).items()
+    }
+
+_DURATION_RANGE = re.compile(r"(\d+)-(\d+)")
+
+def _average_days(typical_duration: str) -> Optional[float]:
+    """Average of a typical duration range like "3-7 days", or None if it is not a range"""
+    match = _DURATION_RANGE.search(typical_duration)
+    if not match:
+        return None
+    return (int(match.group(1)) + int(match.group(2))) / 2
+
+# Average number of days spent in each stage, for stages with a typical duration range
+STAGE_AVERAGE_DAYS: Dict[MortgageJourneyStage, float] = {
+    stage: days
+    for stage in MortgageJourneyStage
+    if (days := _average_days(get_journey_stage_description(stage).get("typical_duration", ""))) is not None
+}
+
+# Protection talking points for each life event, shared by every caller
+_LIFE_EVENT_TALKING_POINTS = MappingProxyType({
+    LifeEvent.NEW_HOME_PURCHASE: [
+        "A new home is one of the biggest investments you'll make. Protection ensures this investment remains secure even if unexpected events occur.",
+        "HomeProtector insurance can help ensure your family keeps their home even if you're unable to make payments due to disability, critical illness, or death."
+    ],
+    LifeEvent.MARRIAGE: [
+        "Congratulations on your marriage! As you combine your lives, it's important to think about how you'll protect each other financially.",
+        "Joint mortgage protection can be more cost-effective than individual policies and ensures either spouse can keep the home if something happens to the other."
+    ],
+    LifeEvent.DIVORCE: [
+        "During this transition, it's important to reassess your protection needs, especially if responsibility for the mortgage is changing.",
+        "Individual protection can provide peace of mind as you navigate this new chapter independently."
+    ],
+    LifeEvent.NEW_CHILD: [
+        "Congratulations on your growing family! With a new child, ensuring your family can stay in their home becomes even more important.",
+        "Mortgage protection provides security knowing your child will have a stable home environment regardless of what happens."
+    ],
+    LifeEvent.CAREER_CHANGE: [
+        "A career change often means changes in benefits, including any workplace disability or life insurance.",
+        "Mortgage protection can fill gaps in your new benefits package and provide consistent coverage regardless of where you work."
+    ],
+    LifeEvent.RETIREMENT_PLANNING: [
+        "As you plan for retirement, it's important to consider how your mortgage fits into your overall plan.",
+        "Protection can be especially valuable during this transition to ensure unexpected health events don't derail your retirement plans."
+    ],
+    LifeEvent.HEALTH_CHANGE: [
+        "Changes in health can affect future insurability. Securing protection now ensures you have coverage regardless of future health developments.",
+        "Our critical illness protection can help cover mortgage payments if you're diagnosed with a covered condition."
+    ],
+    LifeEvent.INCOME_CHANGE: [
+        "With changes in your income, it's important to reassess how you would manage your mortgage payments in case of disability or illness.",
+        "Our disability protection can replace a portion of your income specifically for your mortgage payments if you're unable to work."
+    ],
+    LifeEvent.DEPENDENT_CARE: [
+        "Taking on responsibility for caring for a dependent adds financial obligations that make protection even more important.",
+        "Mortgage protection ensures your dependent would have a secure place to live even if something happened to you."
+    ]
+})
+
+_DEFAULT_LIFE_EVENT_TALKING_POINTS = [
+    "Life changes often bring new financial responsibilities and protection needs.",
+    "Let's discuss how your recent life changes might affect your need for mortgage protection."
+]
+
+def get_life_event_protection_talking_points(event: LifeEvent) -> List[str]:
+    """
+    Get talking points about protection that are relevant to specific life events.
+    """
+    # A copy, so callers can't change the shared talking points
+    return list(_LIFE_EVENT_TALKING_POINTS.get(event, _DEFAULT_LIFE_EVENT_TALKING_POINTS))
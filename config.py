@@ -19,7 +19,16 @@ OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-api-key-here")
 
 # Vector DB settings
 COLLECTION_NAME = "documents"
-EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Set CHROMA_HOST to use a separately running Chroma server instead of the local database
+CHROMA_HOST = os.getenv("CHROMA_HOST")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8000"))
+# Changing the embedding model requires re-ingesting documents (clear the vector DB first)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# int8-quantize the embedding model on CPU; like changing models, this calls for re-ingesting
+EMBEDDING_QUANTIZE = os.getenv("EMBEDDING_QUANTIZE", "false").lower() in ("1", "true", "yes")
+CHUNK_MAX_TOKENS = 256  # all-MiniLM-L6-v2 truncates its input at 256 tokens
+CHROMA_BATCH_SIZE = 200  # Documents per collection.add call
+EMBEDDING_BATCH_SIZE = 64  # Texts per embedding model forward pass
 
 # LLM settings
 DEFAULT_MODEL = "gpt-3.5-turbo"
@@ -27,6 +36,11 @@ DEFAULT_TEMPERATURE = 0.3
 MAX_TOKENS = 1000
 MAX_CONTEXT_LENGTH = 3000
 
+# Cache settings for repeated questions
+CACHE_MAX_ENTRIES = 2000
+CACHE_TTL_SECONDS = 300
+SEMANTIC_CACHE_THRESHOLD = 0.97  # Cosine similarity above which two questions share retrieval results
+
 # UI settings
 APP_TITLE = "Certus"
 APP_SUBTITLE = "Mortgage & Creditor Insurance Advisor Assistant"
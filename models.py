@@ -1,8 +1,8 @@
 """
 Data models for the RBC Mortgage & Creditor Insurance Advisor Assistant
 """
-from pydantic import BaseModel, Field, validator
-from typing import List, Optional, Dict, Any, Union
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Literal, Optional, Dict, Any, Tuple, Union
 from enum import Enum
 from datetime import date
 
@@ -30,7 +30,11 @@ class ScreenType(str, Enum):
     INSURANCE_APPLICATION = "insurance_application"
     PAYMENT_CALCULATOR = "payment_calculator"
 
-class ClientProfile(BaseModel):
+class _FrozenModel(BaseModel):
+    """Immutable, hashable model that rejects unknown fields"""
+    model_config = ConfigDict(frozen=True, extra="forbid")
+
+class ClientProfile(_FrozenModel):
     full_name: str
     age: int = Field(..., ge=18, le=100)
     email: Optional[str] = None
@@ -44,71 +48,47 @@ class ClientProfile(BaseModel):
     smoker: bool = False
     pre_existing_conditions: bool = False
     risk_tolerance: Optional[str] = "Medium"
-    
-    @validator('age')
-    def validate_age(cls, v):
-        if v < 18:
-            raise ValueError('Age must be at least 18 years')
-        return v
 
-class MortgageDetails(BaseModel):
+class MortgageDetails(_FrozenModel):
     principal: float = Field(..., gt=0)
     annual_rate: float = Field(..., ge=0, le=30)
     term_years: int = Field(..., ge=1, le=10)
     amortization_years: int = Field(..., ge=5, le=30)
     payment_frequency: PaymentFrequency = PaymentFrequency.MONTHLY
-    
-    @validator('annual_rate')
-    def validate_rate(cls, v):
-        if v < 0 or v > 30:
-            raise ValueError('Interest rate must be between 0 and 30 percent')
-        return v
 
-class InsuranceCoverage(BaseModel):
+class InsuranceCoverage(_FrozenModel):
     coverage_type: CoverageType
     coverage_amount: float = Field(..., ge=0)
     premium: float = Field(..., ge=0)
     term_years: Optional[int] = None
     joint_coverage: bool = False
-    
-    @validator('coverage_amount')
-    def validate_coverage(cls, v):
-        if v < 0:
-            raise ValueError('Coverage amount cannot be negative')
-        return v
 
-class ScenarioSimulation(BaseModel):
+class ScenarioSimulation(_FrozenModel):
     scenario_type: str
     duration_months: int = Field(..., ge=0)
     monthly_impact: float
     total_impact: float
-    recommended_coverage: List[InsuranceCoverage] = []
+    recommended_coverage: Tuple[InsuranceCoverage, ...] = ()
 
-class AdvisorAlert(BaseModel):
+class AdvisorAlert(_FrozenModel):
     alert_id: str
     screen_type: ScreenType
     title: str
     message: str
     action_required: bool = False
-    priority: str = "Medium"  # Low, Medium, High
-    
-    @validator('priority')
-    def validate_priority(cls, v):
-        if v not in ["Low", "Medium", "High"]:
-            raise ValueError('Priority must be Low, Medium, or High')
-        return v
+    priority: Literal["Low", "Medium", "High"] = "Medium"
 
-class ChatMessage(BaseModel):
+class ChatMessage(_FrozenModel):
     role: str  # "user" or "assistant"
     content: str
     timestamp: str
 
-class ChatSession(BaseModel):
+class ChatSession(_FrozenModel):
     session_id: str
-    messages: List[ChatMessage] = []
+    messages: Tuple[ChatMessage, ...] = ()
     client_id: Optional[str] = None
 
-class InsuranceRecommendation(BaseModel):
+class InsuranceRecommendation(_FrozenModel):
     coverage_type: CoverageType
     recommended_amount: float
     monthly_premium: float
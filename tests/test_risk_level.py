@@ -0,0 +1,43 @@
+"""
+Tests that single-client and batch risk scoring agree
+"""
+import random
+
+import pandas as pd
+
+from utils import assess_risk_level, assess_risk_level_batch
+
+_PROFILE_FIELDS = (
+    "age",
+    "dependents",
+    "annual_income",
+    "years_at_current_job",
+    "mortgage_amount",
+    "smoker",
+    "pre_existing_conditions",
+)
+
+def _random_profile(rng):
+    """A client profile with a random subset of fields, so defaults are exercised too"""
+    profile = {
+        "age": rng.randint(18, 80),
+        "dependents": rng.randint(0, 6),
+        "annual_income": rng.choice([0, 49999, 50000, 79999, 80000, rng.randint(0, 250000)]),
+        "years_at_current_job": rng.choice([0, 0.5, 1, 2.9, 3, rng.randint(0, 30)]),
+        "mortgage_amount": rng.randint(0, 1500000),
+        "smoker": rng.random() < 0.3,
+        "pre_existing_conditions": rng.random() < 0.3,
+    }
+    return {field: profile[field] for field in _PROFILE_FIELDS if rng.random() > 0.15}
+
+def test_batch_matches_single_client_scoring():
+    rng = random.Random(0)
+    profiles = [_random_profile(rng) for _ in range(3000)]
+    
+    batch_levels = assess_risk_level_batch(pd.DataFrame(profiles))
+    
+    assert list(batch_levels) == [assess_risk_level(profile) for profile in profiles]
+
+def test_empty_profile_uses_defaults():
+    assert assess_risk_level({}) == "Medium"
+    assert list(assess_risk_level_batch(pd.DataFrame([{}]))) == ["Medium"]
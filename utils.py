@@ -4,15 +4,44 @@ Utility functions for the RBC Mortgage & Creditor Insurance Advisor Assistant
 import os
 import re
 import base64
-# Temporarily removed tiktoken due to installation issues
-import PyPDF2
-from sentence_transformers import SentenceTransformer
-import chromadb
-import openai
+from bisect import bisect_left
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+
+# Cap BLAS/OpenMP threads for torch, which reads these when it is first loaded.
+# Encoding stops scaling past 4-8 cores, and more threads just oversubscribe the
+# CPU that Streamlit, Chroma and the PDF worker processes share. numpy's BLAS is
+# only capped when this module is imported first (e.g. `python utils.py`); under
+# Streamlit numpy is already loaded. Set OMP_NUM_THREADS to override.
+os.environ.setdefault("OMP_NUM_THREADS", str(min(8, os.cpu_count() or 4)))
+os.environ.setdefault("MKL_NUM_THREADS", os.environ["OMP_NUM_THREADS"])
+
+import numpy as np
+import pandas as pd
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    # Deployments that only have PyPDF2 installed fall back to it for PDF text
+    pdfium = None
+
 from config import (
     VECTOR_DB_PATH, 
+    DOCS_DIR,
+    CHROMA_HOST,
+    CHROMA_PORT,
     COLLECTION_NAME, 
+    CHUNK_MAX_TOKENS,
+    CHROMA_BATCH_SIZE,
+    EMBEDDING_BATCH_SIZE,
+    CACHE_MAX_ENTRIES,
+    CACHE_TTL_SECONDS,
+    SEMANTIC_CACHE_THRESHOLD,
     EMBEDDING_MODEL, 
+    EMBEDDING_QUANTIZE,
     OPENAI_API_KEY,
     DEFAULT_MODEL,
     DEFAULT_TEMPERATURE,
@@ -20,116 +49,452 @@ from config import (
     SYSTEM_PROMPT
 )
 
-# Initialize OpenAI API
-openai.api_key = OPENAI_API_KEY
+# torch, the embedding model, chromadb and openai take seconds to import and load,
+# so each is set up on first use. Calculators and PDF helpers never pay for them.
+_model = None
+_model_lock = threading.Lock()
+_client = None
+_client_lock = threading.Lock()
+_openai = None
+_openai_lock = threading.Lock()
 
-# Initialize embedding model
-model = SentenceTransformer(EMBEDDING_MODEL)
+def _get_model():
+    """Get the embedding model, loading it on first use"""
+    global _model
+    if _model is None:
+        with _model_lock:
+            if _model is None:
+                import torch
+                from sentence_transformers import SentenceTransformer
+                
+                # Match torch's intra-op threads to the cap, and keep a single inter-op thread
+                torch.set_num_threads(int(os.environ["OMP_NUM_THREADS"]))
+                try:
+                    torch.set_num_interop_threads(1)
+                except RuntimeError:
+                    # Can only be set before torch runs any parallel work, e.g. not on a module reload
+                    pass
+                
+                # SentenceTransformer places the model on the GPU when one is available
+                embedding_model = SentenceTransformer(EMBEDDING_MODEL)
+                if embedding_model.device.type == "cuda":
+                    # Half precision roughly doubles GPU encoding throughput
+                    embedding_model.half()
+                elif EMBEDDING_QUANTIZE:
+                    # int8 weights for the transformer's linear layers, the bulk of CPU encoding time
+                    torch.quantization.quantize_dynamic(embedding_model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+                # Only publish the model once it is fully set up
+                _model = embedding_model
+    return _model
 
-# Initialize ChromaDB client
-try:
-    # Try the newer API first
-    client = chromadb.Client(chromadb.Settings(persist_directory=str(VECTOR_DB_PATH)))
-except Exception as e:
+class _DummyClient:
+    """Stands in when Chroma can't be reached, so the app starts but retrieval fails"""
+    def get_collection(self, name):
+        raise Exception("ChromaDB not properly initialized")
+    def create_collection(self, name):
+        raise Exception("ChromaDB not properly initialized")
+    def get_or_create_collection(self, name, metadata=None, embedding_function=None):
+        raise Exception("ChromaDB not properly initialized")
+    def delete_collection(self, name):
+        raise Exception("ChromaDB not properly initialized")
+
+def _get_client():
+    """Get the ChromaDB client, connecting on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                client = _create_client()
+                if client is None:
+                    # Not kept, so the next call tries to connect again
+                    return _DummyClient()
+                _client = client
+    return _client
+
+def _create_client():
+    """Connect to the Chroma server if one is configured, else the local database, or None if both fail"""
+    import chromadb
+    
+    def chroma_settings():
+        # Telemetry would otherwise send an HTTP request on client creation and collection calls.
+        # Each client gets its own Settings, as Chroma fills in connection details on the one it is given
+        return chromadb.Settings(anonymized_telemetry=False, allow_reset=False)
+    
+    if CHROMA_HOST:
+        try:
+            # Talk to a Chroma server so inserts and queries run outside the app process
+            return chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT, settings=chroma_settings())
+        except Exception as e:
+            print(f"Error connecting to Chroma at {CHROMA_HOST}:{CHROMA_PORT}, using the local database: {e}")
     try:
-        # Fall back to older API if available
-        client = chromadb.PersistentClient(path=str(VECTOR_DB_PATH))
-    except Exception as e2:
-        print(f"Error initializing ChromaDB: {e2}")
-        # Create a minimal client that won't crash but won't work either
-        # At least the app will start
-        class DummyClient:
-            def get_collection(self, name):
-                raise Exception("ChromaDB not properly initialized")
-            def create_collection(self, name):
-                raise Exception("ChromaDB not properly initialized")
-        client = DummyClient()
-
-def count_tokens(text):
-    """Count the number of tokens in a text
-    
-    This is a simplified version that doesn't require tiktoken.
-    It uses a simple approximation based on whitespace and punctuation.
+        # Keep the index on disk, so restarts reopen it instead of re-embedding everything
+        return chromadb.PersistentClient(path=str(VECTOR_DB_PATH), settings=chroma_settings())
+    except Exception as e:
+        print(f"Error initializing ChromaDB: {e}")
+        return None
+
+def _get_openai():
+    """Import the OpenAI SDK and set the API key on first use"""
+    global _openai
+    if _openai is None:
+        with _openai_lock:
+            if _openai is None:
+                import openai
+                openai.api_key = OPENAI_API_KEY
+                _openai = openai
+    return _openai
+
+class _TTLCache:
+    """Thread-safe LRU cache whose entries expire after ttl seconds"""
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key):
+        """Return the cached value for key, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+    
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class _SemanticCache:
+    """Thread-safe cache looked up by embedding similarity, with LRU eviction and a TTL
+    
+    Entries live in one preallocated matrix of unit vectors, so a lookup is a
+    single matrix-vector product against every cached query.
     """
-    # Simple approximation: 1 token ~= 4 characters in English
-    return len(text) // 4
+    def __init__(self, maxsize, ttl, threshold):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._embeddings = None
+        self._top_k = np.zeros(maxsize, dtype=np.int64)
+        self._expires_at = np.full(maxsize, -np.inf)
+        self._last_used = np.full(maxsize, -np.inf)
+        self._values = [None] * maxsize
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _unit(embedding):
+        vector = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+    
+    def get(self, embedding, top_k):
+        """Return the value cached for the most similar live query, or None below the threshold"""
+        with self._lock:
+            if self._embeddings is None:
+                return None
+            now = time.monotonic()
+            similarities = self._embeddings @ self._unit(embedding)
+            similarities[(self._expires_at < now) | (self._top_k != top_k)] = -np.inf
+            best = int(similarities.argmax())
+            if similarities[best] < self.threshold:
+                return None
+            self._last_used[best] = now
+            return self._values[best]
+    
+    def set(self, embedding, top_k, value):
+        vector = self._unit(embedding)
+        with self._lock:
+            if self._embeddings is None:
+                self._embeddings = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            now = time.monotonic()
+            # Reuse an empty or expired slot if there is one, otherwise evict the least recently used
+            slot = int(np.where(self._expires_at < now, -np.inf, self._last_used).argmin())
+            self._embeddings[slot] = vector
+            self._top_k[slot] = top_k
+            self._expires_at[slot] = now + self.ttl
+            self._last_used[slot] = now
+            self._values[slot] = value
+    
+    def clear(self):
+        with self._lock:
+            self._expires_at.fill(-np.inf)
+            self._last_used.fill(-np.inf)
+            self._values = [None] * self.maxsize
 
-def split_text_into_chunks(text, max_tokens=500):
-    """Split text into chunks of max_tokens"""
-    # Clean and normalize text
-    text = re.sub(r'\s+', ' ', text).strip()
+# Recent retrieval results and responses, so repeated questions skip Chroma and OpenAI
+_retrieval_cache = _TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+# Retrieval results by query embedding, so rephrasings of a recent question skip Chroma too
+_semantic_retrieval_cache = _SemanticCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, SEMANTIC_CACHE_THRESHOLD)
+_response_cache = _TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS)
+
+def _invalidate_retrieval_caches():
+    """Forget cached retrieval results, called whenever the collection changes"""
+    _retrieval_cache.clear()
+    _semantic_retrieval_cache.clear()
+
+# Simple approximation: 1 token ~= 4 characters in English
+CHARS_PER_TOKEN = 4
+
+def _max_chars(max_tokens):
+    """The longest text, in characters, that is still within max_tokens"""
+    return (max_tokens + 1) * CHARS_PER_TOKEN - 1
+
+def _pack_pieces(pieces, max_chars):
+    """Greedily join pieces with spaces into chunks of at most max_chars
     
-    # Split by paragraphs first
-    paragraphs = text.split('\n\n')
+    The length of the chunk being built is tracked as pieces are added, so
+    each piece is measured once instead of re-counting the growing chunk.
+    """
     chunks = []
-    current_chunk = ""
-    
-    for paragraph in paragraphs:
-        # If adding this paragraph would exceed max_tokens, add current chunk to chunks and start a new one
-        if count_tokens(current_chunk + " " + paragraph) > max_tokens and current_chunk:
-            chunks.append(current_chunk.strip())
-            current_chunk = paragraph
+    current = []
+    current_len = 0
+    for piece in pieces:
+        # If adding this piece would exceed max_chars, close the current chunk and start a new one
+        if current_len and current_len + 1 + len(piece) > max_chars:
+            chunks.append(" ".join(current).strip())
+            current = [piece]
+            current_len = len(piece)
         else:
-            current_chunk += " " + paragraph if current_chunk else paragraph
+            current_len += 1 + len(piece) if current else len(piece)
+            current.append(piece)
     
     # Add the last chunk if it's not empty
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if current_len:
+        chunks.append(" ".join(current).strip())
+    return chunks
+
+_WHITESPACE = re.compile(r'\s+')
+_SENTENCE_BOUNDARY = re.compile(r'(?<=[.!?])\s+')
+
+def _iter_sentences(text):
+    """Yield the sentences of a text one at a time instead of building a list"""
+    start = 0
+    for boundary in _SENTENCE_BOUNDARY.finditer(text):
+        yield text[start:boundary.start()]
+        start = boundary.end()
+    yield text[start:]
+
+def split_text_into_chunks(text, max_tokens=500):
+    """Split text into chunks of max_tokens"""
+    # Tokens are approximated by characters, so compare lengths directly
+    max_chars = _max_chars(max_tokens)
+    
+    # Clean and normalize text
+    text = _WHITESPACE.sub(' ', text).strip()
+    
+    # Split by paragraphs first
+    chunks = _pack_pieces(text.split('\n\n'), max_chars)
     
     # If any chunk is still too large, split by sentences
     final_chunks = []
     for chunk in chunks:
-        if count_tokens(chunk) > max_tokens:
-            sentences = re.split(r'(?<=[.!?])\s+', chunk)
-            temp_chunk = ""
-            for sentence in sentences:
-                if count_tokens(temp_chunk + " " + sentence) > max_tokens and temp_chunk:
-                    final_chunks.append(temp_chunk.strip())
-                    temp_chunk = sentence
-                else:
-                    temp_chunk += " " + sentence if temp_chunk else sentence
-            if temp_chunk:
-                final_chunks.append(temp_chunk.strip())
+        if len(chunk) > max_chars:
+            final_chunks.extend(_pack_pieces(_iter_sentences(chunk), max_chars))
         else:
             final_chunks.append(chunk)
     
     return final_chunks
 
-def extract_text_from_pdf(pdf_path):
-    """Extract text from a PDF file"""
-    with open(pdf_path, "rb") as f:
-        pdf_reader = PyPDF2.PdfReader(f)
-        text = ""
-        for page in pdf_reader.pages:
-            text += page.extract_text()
-    return text
+# Below this many pages, starting worker processes costs more than it saves
+_PARALLEL_PDF_MIN_PAGES = 32
+
+def _extract_page_range(pdf_path, start, stop):
+    """Extract the text of pages start to stop (exclusive) of a PDF file"""
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        return "\n".join(pdf[i].get_textpage().get_text_range() for i in range(start, stop))
+    finally:
+        pdf.close()
+
+def extract_text_from_pdf(pdf_path, workers=1):
+    """Extract text from a PDF file
+    
+    PDFium is not thread-safe, so with workers > 1 a large PDF is split into
+    page ranges that are extracted in separate processes.
+    """
+    if pdfium is None:
+        import PyPDF2
+        with open(pdf_path, "rb") as f:
+            # Image-only pages can yield no text
+            return "\n".join(page.extract_text() or "" for page in PyPDF2.PdfReader(f).pages)
+    
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page_count = len(pdf)
+        if workers <= 1 or page_count < _PARALLEL_PDF_MIN_PAGES:
+            return "\n".join(page.get_textpage().get_text_range() for page in pdf)
+    finally:
+        pdf.close()
+    
+    pages_per_worker = -(-page_count // workers)
+    starts = range(0, page_count, pages_per_worker)
+    stops = [min(start + pages_per_worker, page_count) for start in starts]
+    with ProcessPoolExecutor(max_workers=len(starts)) as executor:
+        return "\n".join(executor.map(_extract_page_range, [pdf_path] * len(starts), starts, stops))
+
+def _read_text_file(path):
+    """Read a plain text or markdown document"""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+def _content_id(content):
+    """Stable id for a chunk derived from its content, so re-ingesting it is a no-op"""
+    return hashlib.blake2b(content.encode("utf-8"), digest_size=16).hexdigest()
+
+def documents_from_text(text, source):
+    """Split a document's text into chunk records ready for initialize_db"""
+    return [
+        {
+            "id": _content_id(chunk),
+            "content": chunk,
+            "source": source,
+            "chunk": i
+        }
+        for i, chunk in enumerate(split_text_into_chunks(text, max_tokens=CHUNK_MAX_TOKENS))
+    ]
+
+def _read_document(path, workers=1):
+    """Extract the text of a PDF, text or markdown file, or None if it can't be read
+    
+    A corrupt or password-protected file is logged and skipped rather than
+    failing the whole folder.
+    """
+    try:
+        if path.lower().endswith(".pdf"):
+            return extract_text_from_pdf(path, workers)
+        return _read_text_file(path)
+    except Exception as e:
+        print(f"Skipping {path}: {e}")
+        return None
+
+def load_docs(folder=DOCS_DIR):
+    """Load and chunk every PDF, text and markdown document in a folder
+    
+    PDF extraction is CPU-bound and PDFium is not thread-safe, so files are
+    parsed in parallel worker processes; text files only need I/O and are
+    read on threads.
+    """
+    names = sorted(os.listdir(folder))
+    pdf_paths = [os.path.join(folder, name) for name in names if name.lower().endswith(".pdf")]
+    text_paths = [os.path.join(folder, name) for name in names if name.lower().endswith((".txt", ".md"))]
+    
+    texts = {}
+    if len(pdf_paths) > 1:
+        with ProcessPoolExecutor(max_workers=min(len(pdf_paths), os.cpu_count() or 1)) as executor:
+            texts.update(zip(pdf_paths, executor.map(_read_document, pdf_paths)))
+    elif pdf_paths:
+        # A single PDF can still be split into page ranges if it is large enough
+        texts[pdf_paths[0]] = _read_document(pdf_paths[0], workers=os.cpu_count() or 1)
+    if len(text_paths) > 1:
+        with ThreadPoolExecutor() as executor:
+            texts.update(zip(text_paths, executor.map(_read_document, text_paths)))
+    elif text_paths:
+        texts[text_paths[0]] = _read_document(text_paths[0])
+    
+    documents = []
+    for path in pdf_paths + text_paths:
+        if texts[path] is not None:
+            documents.extend(documents_from_text(texts[path], os.path.basename(path)))
+    return documents
+
+def encode_texts(texts):
+    """Embed a list of texts in batched forward passes
+    
+    SentenceTransformer sorts the texts by length before batching so each
+    batch pads as little as possible, and restores their order afterwards.
+    The embeddings are unit-norm and returned as one float32 array, 1.5 KB per vector
+    instead of ~11 KB as a list of Python floats. Chroma only accepts lists,
+    so convert just the rows being sent in each call.
+    """
+    return _get_model().encode(
+        texts,
+        batch_size=EMBEDDING_BATCH_SIZE,
+        show_progress_bar=False,
+        convert_to_numpy=True,
+        normalize_embeddings=True
+    ).astype(np.float32, copy=False)
+
+# HNSW index settings, only applied when the collection is created. Cosine matches
+# how sentence-transformer embeddings are trained, and they are stored unit-norm.
+_COLLECTION_METADATA = {"hnsw:space": "cosine", "hnsw:construction_ef": 200, "hnsw:M": 32}
+
+def _get_collection():
+    """Get the document collection, creating it if it doesn't exist yet"""
+    # Embeddings are always computed here and passed in, Chroma must never embed with its own model
+    return _get_client().get_or_create_collection(
+        COLLECTION_NAME,
+        metadata=_COLLECTION_METADATA,
+        embedding_function=None
+    )
+
+def clear_vector_db():
+    """Remove all documents from the vector database"""
+    try:
+        _get_client().delete_collection(COLLECTION_NAME)
+    except ValueError:
+        # Nothing to clear if the collection was never created
+        pass
+    except Exception as e:
+        print(f"Error clearing database: {e}")
+        return False
+    _invalidate_retrieval_caches()
+    return True
 
 def initialize_db(documents):
     """Initialize or update the vector database with documents"""
     try:
-        # Create collection or get existing one
-        try:
-            collection = client.get_collection(COLLECTION_NAME)
-            print(f"Found existing collection: {COLLECTION_NAME}")
-        except:
-            collection = client.create_collection(COLLECTION_NAME)
-            print(f"Created new collection: {COLLECTION_NAME}")
+        collection = _get_collection()
+        
+        # Skip documents that are already stored, so unchanged content isn't embedded again
+        unique_documents = {}
+        for doc in documents:
+            unique_documents.setdefault(doc["id"], doc)
+        ids = list(unique_documents)
+        existing_ids = set()
+        for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+            existing_ids.update(collection.get(ids=ids[start:start + CHROMA_BATCH_SIZE], include=[])["ids"])
+        documents = [doc for doc_id, doc in unique_documents.items() if doc_id not in existing_ids]
+        if not documents:
+            print("All documents are already in the collection")
+            return True
         
         # Prepare documents, embeddings, and IDs for the collection
         ids = [doc["id"] for doc in documents]
         texts = [doc["content"] for doc in documents]
-        metadatas = [{"source": doc["source"]} for doc in documents]
+        metadatas = [{"source": doc["source"], "chunk": doc.get("chunk", 0)} for doc in documents]
         
-        # Generate embeddings for all texts
-        embeddings = [model.encode(text).tolist() for text in texts]
-        
-        # Add documents to collection
-        collection.add(
-            ids=ids,
-            embeddings=embeddings,
-            documents=texts,
-            metadatas=metadatas
-        )
+        # Embed the next batch on a worker thread while the current one is written,
+        # so encoding overlaps Chroma I/O and only two batches of embeddings are held
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = executor.submit(encode_texts, texts[:CHROMA_BATCH_SIZE])
+            for start in range(0, len(ids), CHROMA_BATCH_SIZE):
+                end = start + CHROMA_BATCH_SIZE
+                embeddings = pending.result()
+                if end < len(ids):
+                    pending = executor.submit(encode_texts, texts[end:end + CHROMA_BATCH_SIZE])
+                
+                # Upsert so a re-run after a partial ingest doesn't fail on ids already stored
+                collection.upsert(
+                    ids=ids[start:end],
+                    embeddings=embeddings.tolist(),
+                    documents=texts[start:end],
+                    metadatas=metadatas[start:end]
+                )
+                # Cached results predate these documents
+                _invalidate_retrieval_caches()
+                print(f"Stored {min(end, len(ids))}/{len(ids)} documents")
         
         print(f"Added {len(documents)} documents to the collection")
         return True
@@ -137,123 +502,154 @@ def initialize_db(documents):
         print(f"Error initializing database: {e}")
         return False
 
+def ingest(folder=DOCS_DIR):
+    """Load the documents in a folder into the vector database if none are stored yet
+    
+    A database that already has documents is left alone, so restarts reuse
+    the persisted embeddings instead of parsing and embedding everything again.
+    The default documents seeded on an empty query don't count.
+    """
+    try:
+        stored = _get_collection().get(where={"source": {"$ne": "default"}}, limit=1, include=[])
+        if stored["ids"]:
+            return True
+    except Exception as e:
+        print(f"Error opening database: {e}")
+        return False
+    
+    documents = load_docs(folder)
+    if not documents:
+        print(f"No documents found in {folder}")
+        return False
+    return initialize_db(documents)
+
+# Documents seeded into an empty collection
+_DEFAULT_DOCS = (
+    {
+        "id": "default-mortgage-1",
+        "content": "HomeProtector mortgage life insurance provides coverage for your mortgage in case of death. The premium is based on your age, mortgage amount, and whether you choose single or joint coverage.",
+        "source": "default"
+    },
+    {
+        "id": "default-mortgage-2",
+        "content": "If you become disabled and are unable to work, HomeProtector disability insurance can help cover your mortgage payments for up to 24 months per disability.",
+        "source": "default"
+    },
+    {
+        "id": "default-mortgage-3",
+        "content": "Critical illness insurance provides a lump sum payment that is applied directly to your mortgage if you're diagnosed with a covered condition like cancer, heart attack, or stroke.",
+        "source": "default"
+    },
+    {
+        "id": "default-insurance-1",
+        "content": "RBC HomeProtector Insurance offers three types of coverage: life, disability, and critical illness. Life insurance covers your mortgage balance, disability helps with monthly payments if you can't work, and critical illness provides a lump sum for covered conditions.",
+        "source": "default"
+    },
+    {
+        "id": "default-insurance-2",
+        "content": "Premium rates for HomeProtector life insurance range from $0.10 to $1.63 per $1,000 of the initial insured mortgage balance, depending on age. Joint coverage rates are higher.",
+        "source": "default"
+    },
+    {
+        "id": "default-insurance-3",
+        "content": "To be eligible for HomeProtector insurance, you must be a Canadian resident, between 18-69 years of age for life insurance, 18-65 for disability, and 18-55 for critical illness insurance.",
+        "source": "default"
+    },
+    {
+        "id": "default-general-1",
+        "content": "RBC offers various mortgage terms from 6 months to 10 years, with both fixed and variable rate options. The most popular term is 5 years.",
+        "source": "default"
+    },
+    {
+        "id": "default-general-2",
+        "content": "When interest rates increase, your mortgage payments will also increase if you have a variable rate mortgage. With a fixed rate, your payments remain the same until the end of your term.",
+        "source": "default"
+    }
+)
+
+# Keyword fallbacks for when the collection returns nothing
+_FALLBACK_MORTGAGE = tuple(doc["content"] for doc in _DEFAULT_DOCS[0:3])
+_FALLBACK_INSURANCE = tuple(doc["content"] for doc in _DEFAULT_DOCS[3:6])
+_FALLBACK_GENERAL = tuple(doc["content"] for doc in _DEFAULT_DOCS[6:8])
+
+# Shown when the knowledge base can't be reached at all
+_FALLBACK_UNAVAILABLE = (
+    "I'm currently having trouble accessing my knowledge base. Here's some general information that might help:",
+    "RBC HomeProtector Insurance offers protection for your mortgage with life, disability, and critical illness coverage options.",
+    "You can ask me about mortgage terms, insurance eligibility, or payment calculations, and I'll do my best to assist you."
+)
+
+@lru_cache(maxsize=256)
+def _embed_query(query):
+    """Embed a query, cached so repeated questions skip the model"""
+    embedding = encode_texts([query])[0]
+    # The cached array is shared between callers
+    embedding.setflags(write=False)
+    return embedding
+
 def retrieve_relevant_chunks(query, top_k=5):
     """Retrieve relevant chunks from vector database based on query"""
+    # Case and spacing don't change the (uncased) embedding, so they don't change the key either
+    cache_key = (" ".join(query.lower().split()), top_k)
+    cached_chunks = _retrieval_cache.get(cache_key)
+    if cached_chunks is not None:
+        return list(cached_chunks)
+    
     try:
-        # Check if collection exists, if not create it with default data
-        try:
-            collection = client.get_collection(COLLECTION_NAME)
-        except Exception as collection_error:
-            print(f"Collection not found, initializing with default data: {collection_error}")
-            # Create a new collection
-            collection = client.create_collection(COLLECTION_NAME)
-            
-            # Add some default documents
-            default_docs = [
-                {
-                    "id": "default-mortgage-1",
-                    "content": "HomeProtector mortgage life insurance provides coverage for your mortgage in case of death. The premium is based on your age, mortgage amount, and whether you choose single or joint coverage.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-mortgage-2",
-                    "content": "If you become disabled and are unable to work, HomeProtector disability insurance can help cover your mortgage payments for up to 24 months per disability.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-mortgage-3",
-                    "content": "Critical illness insurance provides a lump sum payment that is applied directly to your mortgage if you're diagnosed with a covered condition like cancer, heart attack, or stroke.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-insurance-1",
-                    "content": "RBC HomeProtector Insurance offers three types of coverage: life, disability, and critical illness. Life insurance covers your mortgage balance, disability helps with monthly payments if you can't work, and critical illness provides a lump sum for covered conditions.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-insurance-2",
-                    "content": "Premium rates for HomeProtector life insurance range from $0.10 to $1.63 per $1,000 of the initial insured mortgage balance, depending on age. Joint coverage rates are higher.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-insurance-3",
-                    "content": "To be eligible for HomeProtector insurance, you must be a Canadian resident, between 18-69 years of age for life insurance, 18-65 for disability, and 18-55 for critical illness insurance.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-general-1",
-                    "content": "RBC offers various mortgage terms from 6 months to 10 years, with both fixed and variable rate options. The most popular term is 5 years.",
-                    "source": "default"
-                },
-                {
-                    "id": "default-general-2",
-                    "content": "When interest rates increase, your mortgage payments will also increase if you have a variable rate mortgage. With a fixed rate, your payments remain the same until the end of your term.",
-                    "source": "default"
-                }
-            ]
-            
-            # Initialize the database with default documents
-            initialize_db(default_docs)
-            
-            # Try to get the collection again
-            collection = client.get_collection(COLLECTION_NAME)
+        query_embedding = _embed_query(query)
+        cached_chunks = _semantic_retrieval_cache.get(query_embedding, top_k)
+        if cached_chunks is not None:
+            return list(cached_chunks)
         
-        # Generate embedding for the query
-        query_embedding = model.encode(query).tolist()
+        # Seed an empty collection with default data
+        collection = _get_collection()
+        if collection.count() == 0:
+            print(f"Collection {COLLECTION_NAME} is empty, initializing with default data")
+            initialize_db(_DEFAULT_DOCS)
         
-        # Query the collection
+        # Query the collection, only the documents are used
         results = collection.query(
-            query_embeddings=[query_embedding],
-            n_results=top_k
+            query_embeddings=[query_embedding.tolist()],
+            n_results=top_k,
+            include=["documents"]
         )
         
         # Extract the documents from results
         if results and 'documents' in results and results['documents']:
             chunks = results['documents'][0]
+            _retrieval_cache.set(cache_key, tuple(chunks))
+            _semantic_retrieval_cache.set(query_embedding, top_k, tuple(chunks))
             return chunks
         else:
             # Fallback to keyword-based responses if no results
             if "mortgage" in query.lower():
-                return [
-                    "HomeProtector mortgage life insurance provides coverage for your mortgage in case of death. The premium is based on your age, mortgage amount, and whether you choose single or joint coverage.",
-                    "If you become disabled and are unable to work, HomeProtector disability insurance can help cover your mortgage payments for up to 24 months per disability.",
-                    "Critical illness insurance provides a lump sum payment that is applied directly to your mortgage if you're diagnosed with a covered condition like cancer, heart attack, or stroke."
-                ]
+                return list(_FALLBACK_MORTGAGE)
             elif "insurance" in query.lower():
-                return [
-                    "RBC HomeProtector Insurance offers three types of coverage: life, disability, and critical illness. Life insurance covers your mortgage balance, disability helps with monthly payments if you can't work, and critical illness provides a lump sum for covered conditions.",
-                    "Premium rates for HomeProtector life insurance range from $0.10 to $1.63 per $1,000 of the initial insured mortgage balance, depending on age. Joint coverage rates are higher.",
-                    "To be eligible for HomeProtector insurance, you must be a Canadian resident, between 18-69 years of age for life insurance, 18-65 for disability, and 18-55 for critical illness insurance."
-                ]
+                return list(_FALLBACK_INSURANCE)
             else:
-                return [
-                    "RBC offers various mortgage terms from 6 months to 10 years, with both fixed and variable rate options. The most popular term is 5 years.",
-                    "When interest rates increase, your mortgage payments will also increase if you have a variable rate mortgage. With a fixed rate, your payments remain the same until the end of your term."
-                ]
+                return list(_FALLBACK_GENERAL)
     except Exception as e:
         print(f"Error retrieving chunks: {e}")
         # Return a more user-friendly message instead of the error
-        return [
-            "I'm currently having trouble accessing my knowledge base. Here's some general information that might help:",
-            "RBC HomeProtector Insurance offers protection for your mortgage with life, disability, and critical illness coverage options.",
-            "You can ask me about mortgage terms, insurance eligibility, or payment calculations, and I'll do my best to assist you."
-        ]
+        return list(_FALLBACK_UNAVAILABLE)
 
-def generate_response(query, relevant_docs, max_context_length=3000, user_info = ""):
-    """Generate a response using OpenAI"""
-    if not relevant_docs:
-        return "I don't have enough information to answer that question. Please provide more context."
-    
-    # Combine relevant docs into context
+@lru_cache(maxsize=256)
+def _build_context(relevant_docs, max_context_length):
+    """Combine retrieved docs into prompt context, cached per tuple of docs"""
     context = "\n\n".join(relevant_docs)
     
     # If context is too long, truncate it
-    if count_tokens(context) > max_context_length:
-        # Split into chunks and use the most relevant ones
-        chunks = split_text_into_chunks(context, max_tokens=max_context_length // 2)
-        context = "\n\n".join(chunks[:2])  # Use the first two chunks
-    
-    prompt = f"""
+    char_budget = max_context_length * CHARS_PER_TOKEN
+    if len(context) > char_budget:
+        # Docs are already chunked at ingest, so just give each an equal share of the budget
+        doc_budget = char_budget // len(relevant_docs)
+        context = "\n\n".join(doc[:doc_budget] for doc in relevant_docs)
+    return context
+
+def _build_prompt(query, relevant_docs, max_context_length, user_info):
+    """Build the user prompt for a question and its retrieved docs"""
+    context = _build_context(tuple(relevant_docs), max_context_length)
+    return f"""
 Context:
 {context}
 
@@ -263,211 +659,295 @@ User information:
 Question: {query}
 """
 
+_openai_client = None
+_openai_client_lock = threading.Lock()
+
+def _get_openai_client():
+    """Get the OpenAI >= 1.0.0 client, created once so its connection pool is reused"""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_client_lock:
+            # Concurrent sessions may race here, only the first one builds the client
+            if _openai_client is None:
+                import httpx
+                # Keep connections alive and multiplex requests over HTTP/2, and fail fast if the API can't be reached
+                http_client = httpx.Client(
+                    http2=True,
+                    limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+                    timeout=httpx.Timeout(600.0, connect=5.0)
+                )
+                _openai_client = _get_openai().OpenAI(api_key=OPENAI_API_KEY, http_client=http_client)
+    return _openai_client
+
+def _chat_completion(prompt, stream=False):
+    """Send the prompt to the chat completion API"""
+    messages = [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": prompt}
+    ]
+    if hasattr(_get_openai(), "OpenAI"):
+        # OpenAI >= 1.0.0 API format, through the shared client
+        return _get_openai_client().chat.completions.create(
+            model=DEFAULT_MODEL,
+            messages=messages,
+            temperature=DEFAULT_TEMPERATURE,
+            max_tokens=MAX_TOKENS,
+            stream=stream
+        )
+    # OpenAI < 1.0.0 API format
+    return _get_openai().ChatCompletion.create(
+        model=DEFAULT_MODEL,
+        messages=messages,
+        temperature=DEFAULT_TEMPERATURE,
+        max_tokens=MAX_TOKENS,
+        stream=stream
+    )
+
+def generate_response(query, relevant_docs, max_context_length=3000, user_info = ""):
+    """Generate a response using OpenAI"""
+    if not relevant_docs:
+        return "I don't have enough information to answer that question. Please provide more context."
+    
+    prompt = _build_prompt(query, relevant_docs, max_context_length, user_info)
+    prompt_key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    cached_response = _response_cache.get(prompt_key)
+    if cached_response is not None:
+        return cached_response
+    
     try:
-        # Try with OpenAI < 1.0.0 API format first
-        try:
-            response = openai.ChatCompletion.create(
-                model=DEFAULT_MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=DEFAULT_TEMPERATURE,
-                max_tokens=MAX_TOKENS
-            )
-            return response.choices[0].message.content.strip()
-        except (AttributeError, TypeError):
-            # Fall back to OpenAI >= 1.0.0 API format
-            from openai import OpenAI
-            client = OpenAI(api_key=OPENAI_API_KEY)
-            response = client.chat.completions.create(
-                model=DEFAULT_MODEL,
-                messages=[
-                    {"role": "system", "content": SYSTEM_PROMPT},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=DEFAULT_TEMPERATURE,
-                max_tokens=MAX_TOKENS
-            )
-            return response.choices[0].message.content.strip()
+        response = _chat_completion(prompt)
+        text = response.choices[0].message.content.strip()
+        _response_cache.set(prompt_key, text)
+        return text
     except Exception as e:
         print(f"Error with OpenAI API: {e}")
         return "I'm having trouble generating a response right now. Please try again later."
 
+def stream_response(query, relevant_docs, max_context_length=3000, user_info = ""):
+    """Generate a response using OpenAI, yielding text as it arrives"""
+    if not relevant_docs:
+        yield "I don't have enough information to answer that question. Please provide more context."
+        return
+    
+    prompt = _build_prompt(query, relevant_docs, max_context_length, user_info)
+    prompt_key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+    cached_response = _response_cache.get(prompt_key)
+    if cached_response is not None:
+        yield cached_response
+        return
+    
+    try:
+        parts = []
+        for chunk in _chat_completion(prompt, stream=True):
+            if chunk.choices:
+                # The first and last deltas carry no content
+                part = getattr(chunk.choices[0].delta, "content", None) or ""
+                parts.append(part)
+                yield part
+        _response_cache.set(prompt_key, "".join(parts).strip())
+    except Exception as e:
+        print(f"Error with OpenAI API: {e}")
+        yield "I'm having trouble generating a response right now. Please try again later."
+
+# Number of payments per year for each payment frequency
+_PAYMENTS_PER_YEAR = {
+    "weekly": 52,
+    "biweekly": 26,
+    "monthly": 12,
+    "semi_monthly": 24
+}
+
 def calculate_mortgage_payment(principal, annual_rate, years, payment_frequency="monthly"):
-    """Calculate mortgage payment based on principal, rate, and term"""
-    # Convert annual rate to decimal
-    rate = annual_rate / 100
+    """Calculate mortgage payment based on principal, rate, and term
     
+    principal, annual_rate and years may be numpy arrays, in which case the
+    payments for every combination are computed at once with broadcasting.
+    """
     # Determine number of payments based on frequency
-    payments_per_year = {
-        "weekly": 52,
-        "biweekly": 26,
-        "monthly": 12,
-        "semi_monthly": 24
-    }.get(payment_frequency, 12)
+    payments_per_year = _PAYMENTS_PER_YEAR.get(payment_frequency, 12)
+    
+    # Plain numbers skip numpy, whose overhead dwarfs a single payment
+    if all(isinstance(value, (int, float)) for value in (principal, annual_rate, years)):
+        n_payments = years * payments_per_year
+        periodic_rate = annual_rate / 100 / payments_per_year
+        if periodic_rate == 0:
+            return principal / n_payments
+        return principal * (periodic_rate * (1 + periodic_rate) ** n_payments) / ((1 + periodic_rate) ** n_payments - 1)
     
     # Calculate total number of payments
-    n_payments = years * payments_per_year
+    n_payments = np.asarray(years) * payments_per_year
     
-    # Calculate periodic interest rate
-    periodic_rate = rate / payments_per_year
+    # Calculate periodic interest rate, converting the annual rate to decimal
+    periodic_rate = np.asarray(annual_rate) / 100 / payments_per_year
     
-    # Calculate payment using the mortgage payment formula
-    if periodic_rate == 0:
-        payment = principal / n_payments
-    else:
-        payment = principal * (periodic_rate * (1 + periodic_rate) ** n_payments) / ((1 + periodic_rate) ** n_payments - 1)
+    # Calculate payment using the mortgage payment formula, or straight-line when there is no interest
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + periodic_rate) ** n_payments
+        payment = np.where(
+            periodic_rate == 0,
+            principal / n_payments,
+            principal * (periodic_rate * growth) / (growth - 1)
+        )
     
-    return payment
+    # Scalar array inputs get a scalar back
+    return payment[()]
+
+@lru_cache(maxsize=64)
+def _encode_file_base64(path, mtime):
+    """Base64 encode a file, cached per path and modification time"""
+    with open(path, "rb") as f:
+        return base64.b64encode(f.read()).decode('utf-8')
 
 def get_base64_encoded_image(image_path):
     """Get base64 encoded image for embedding in HTML"""
-    with open(image_path, "rb") as img_file:
-        return base64.b64encode(img_file.read()).decode('utf-8')
+    return _encode_file_base64(image_path, os.path.getmtime(image_path))
 
 def get_base64_pdf(pdf_path):
     """Get base64 encoded PDF for embedding in HTML"""
-    with open(pdf_path, "rb") as pdf_file:
-        return base64.b64encode(pdf_file.read()).decode('utf-8')
+    return _encode_file_base64(pdf_path, os.path.getmtime(pdf_path))
 
-def assess_risk_level(client_data):
-    """Assess client's risk level based on their profile"""
-    # Initialize risk score
-    risk_score = 0
+# Risk score bands shared by assess_risk_level and assess_risk_level_batch. Each band is
+# (bound, points), checked in order; the first band the value falls in scores its points.
+_AGE_RISK_BANDS = ((30, 3), (40, 2), (50, 1))  # age below bound, younger = higher risk
+_INCOME_RISK_BANDS = ((50000, 2), (80000, 1))  # annual income below bound
+_JOB_TENURE_RISK_BANDS = ((1, 2), (3, 1))  # years at current job below bound
+_MORTGAGE_TO_INCOME_RISK_BANDS = ((5, 3), (3, 2), (2, 1))  # ratio above bound
+_MAX_DEPENDENTS_RISK = 3  # one point per dependent, capped
+_HEALTH_RISK = 2  # for smoking and for pre-existing conditions, each
+_RISK_LEVELS = ((10, "High"), (6, "Medium"))  # score at least bound, otherwise "Low"
+
+def _points_below(value, bands):
+    for bound, points in bands:
+        if value < bound:
+            return points
+    return 0
+
+def _points_above(value, bands):
+    for bound, points in bands:
+        if value > bound:
+            return points
+    return 0
+
+def _client_column(clients_df, name, default):
+    """A client attribute as a numpy array, using the default where it is missing"""
+    if name not in clients_df:
+        return np.full(len(clients_df), default)
+    return clients_df[name].fillna(default).to_numpy()
+
+def assess_risk_level_batch(clients_df):
+    """Assess the risk level of every client in a DataFrame of client profiles
+    
+    Scores the same factors as assess_risk_level, for all clients at once on
+    the column arrays.
+    Returns a Series of "Low", "Medium" or "High" aligned with the DataFrame.
+    """
+    age = _client_column(clients_df, "age", 35)
+    dependents = _client_column(clients_df, "dependents", 0)
+    income = _client_column(clients_df, "annual_income", 0).astype(float)
+    years_at_job = _client_column(clients_df, "years_at_current_job", 0)
+    mortgage_amount = _client_column(clients_df, "mortgage_amount", 0).astype(float)
+    
+    risk_score = np.zeros(len(clients_df))
     
     # Age factor (younger = higher risk)
-    age = client_data.get("age", 35)
-    if age < 30:
-        risk_score += 3
-    elif age < 40:
-        risk_score += 2
-    elif age < 50:
-        risk_score += 1
+    risk_score += np.select([age < bound for bound, _ in _AGE_RISK_BANDS], [points for _, points in _AGE_RISK_BANDS], 0)
     
     # Dependents factor
-    dependents = client_data.get("dependents", 0)
-    risk_score += min(dependents, 3)  # Cap at 3
+    risk_score += np.minimum(dependents, _MAX_DEPENDENTS_RISK)
     
     # Income stability factor
-    income = client_data.get("annual_income", 0)
-    years_at_job = client_data.get("years_at_current_job", 0)
+    risk_score += np.select([income < bound for bound, _ in _INCOME_RISK_BANDS], [points for _, points in _INCOME_RISK_BANDS], 0)
+    risk_score += np.select([years_at_job < bound for bound, _ in _JOB_TENURE_RISK_BANDS], [points for _, points in _JOB_TENURE_RISK_BANDS], 0)
     
-    if income < 50000:
-        risk_score += 2
-    elif income < 80000:
-        risk_score += 1
+    # Mortgage to income ratio, only scored when there is an income
+    mortgage_to_income = np.divide(mortgage_amount, income, out=np.zeros(len(income)), where=income > 0)
+    risk_score += np.select(
+        [mortgage_to_income > bound for bound, _ in _MORTGAGE_TO_INCOME_RISK_BANDS],
+        [points for _, points in _MORTGAGE_TO_INCOME_RISK_BANDS],
+        0
+    )
     
-    if years_at_job < 1:
-        risk_score += 2
-    elif years_at_job < 3:
-        risk_score += 1
+    # Health factors
+    risk_score += _HEALTH_RISK * _client_column(clients_df, "smoker", False).astype(bool)
+    risk_score += _HEALTH_RISK * _client_column(clients_df, "pre_existing_conditions", False).astype(bool)
+    
+    # Map score to risk level
+    return pd.Series(
+        np.select([risk_score >= bound for bound, _ in _RISK_LEVELS], [level for _, level in _RISK_LEVELS], "Low"),
+        index=clients_df.index
+    )
+
+def assess_risk_level(client_data):
+    """Assess client's risk level based on their profile"""
+    # Age factor (younger = higher risk)
+    risk_score = _points_below(client_data.get("age", 35), _AGE_RISK_BANDS)
+    
+    # Dependents factor
+    risk_score += min(client_data.get("dependents", 0), _MAX_DEPENDENTS_RISK)
+    
+    # Income stability factor
+    income = client_data.get("annual_income", 0)
+    risk_score += _points_below(income, _INCOME_RISK_BANDS)
+    risk_score += _points_below(client_data.get("years_at_current_job", 0), _JOB_TENURE_RISK_BANDS)
     
     # Mortgage to income ratio
-    mortgage_amount = client_data.get("mortgage_amount", 0)
     if income > 0:
-        mortgage_to_income = mortgage_amount / income
-        if mortgage_to_income > 5:
-            risk_score += 3
-        elif mortgage_to_income > 3:
-            risk_score += 2
-        elif mortgage_to_income > 2:
-            risk_score += 1
+        risk_score += _points_above(client_data.get("mortgage_amount", 0) / income, _MORTGAGE_TO_INCOME_RISK_BANDS)
     
     # Health factors
     if client_data.get("smoker", False):
-        risk_score += 2
-    
+        risk_score += _HEALTH_RISK
     if client_data.get("pre_existing_conditions", False):
-        risk_score += 2
+        risk_score += _HEALTH_RISK
     
     # Map score to risk level
-    if risk_score >= 10:
-        return "High"
-    elif risk_score >= 6:
-        return "Medium"
-    else:
-        return "Low"
+    for bound, level in _RISK_LEVELS:
+        if risk_score >= bound:
+            return level
+    return "Low"
+
+# Upper age of each premium age bracket: 18-30, 31-35, ..., 66-69
+_AGE_BRACKET_LIMITS = (30, 35, 40, 45, 50, 55, 60, 65, 69)
+
+# Base rates per $1,000 of coverage for each age bracket a coverage type is offered in
+_BASE_RATES = {
+    "life": (0.10, 0.15, 0.21, 0.31, 0.44, 0.59, 0.79, 1.06, 1.63),
+    "disability": (0.15, 0.22, 0.33, 0.43, 0.64, 0.95, 1.45, 2.20),
+    "critical_illness": (0.20, 0.27, 0.40, 0.61, 0.95, 1.80)
+}
+
+_RISK_MULTIPLIERS = {
+    "Low": 0.9,
+    "Medium": 1.0,
+    "High": 1.2
+}
 
 def calculate_insurance_premium(age, coverage_amount, coverage_type, joint=False, risk_level="Medium"):
     """Calculate insurance premium based on age, coverage amount, and coverage type"""
-    # Base rates per $1,000 of coverage
-    base_rates = {
-        "life": {
-            "18-30": 0.10,
-            "31-35": 0.15,
-            "36-40": 0.21,
-            "41-45": 0.31,
-            "46-50": 0.44,
-            "51-55": 0.59,
-            "56-60": 0.79,
-            "61-65": 1.06,
-            "66-69": 1.63
-        },
-        "disability": {
-            "18-30": 0.15,
-            "31-35": 0.22,
-            "36-40": 0.33,
-            "41-45": 0.43,
-            "46-50": 0.64,
-            "51-55": 0.95,
-            "56-60": 1.45,
-            "61-65": 2.20
-        },
-        "critical_illness": {
-            "18-30": 0.20,
-            "31-35": 0.27,
-            "36-40": 0.40,
-            "41-45": 0.61,
-            "46-50": 0.95,
-            "51-55": 1.80
-        }
-    }
-    
-    # Determine age bracket
-    age_bracket = ""
-    if 18 <= age <= 30:
-        age_bracket = "18-30"
-    elif 31 <= age <= 35:
-        age_bracket = "31-35"
-    elif 36 <= age <= 40:
-        age_bracket = "36-40"
-    elif 41 <= age <= 45:
-        age_bracket = "41-45"
-    elif 46 <= age <= 50:
-        age_bracket = "46-50"
-    elif 51 <= age <= 55:
-        age_bracket = "51-55"
-    elif 56 <= age <= 60:
-        age_bracket = "56-60"
-    elif 61 <= age <= 65:
-        age_bracket = "61-65"
-    elif 66 <= age <= 69:
-        age_bracket = "66-69"
-    else:
+    if age < 18:
         return None  # Age outside eligible range
     
-    # Check if coverage type and age bracket are valid
-    if coverage_type not in base_rates or age_bracket not in base_rates[coverage_type]:
+    # Find the age bracket, which must be one the coverage type is offered in
+    rates = _BASE_RATES.get(coverage_type)
+    bracket = bisect_left(_AGE_BRACKET_LIMITS, age)
+    if rates is None or bracket >= len(rates):
         return None
     
     # Get base rate
-    rate = base_rates[coverage_type][age_bracket]
+    rate = rates[bracket]
     
     # Apply joint coverage multiplier if applicable
     if joint:
         rate *= 1.75
     
     # Apply risk level adjustment
-    risk_multipliers = {
-        "Low": 0.9,
-        "Medium": 1.0,
-        "High": 1.2
-    }
-    rate *= risk_multipliers.get(risk_level, 1.0)
+    rate *= _RISK_MULTIPLIERS.get(risk_level, 1.0)
     
     # Calculate premium
     premium = (coverage_amount / 1000) * rate
     premium = rate
     
     return round(premium, 2)
+
+if __name__ == "__main__":
+    ingest()